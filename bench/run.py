@@ -0,0 +1,376 @@
+"""
+    Benchmarks the status computation and the parsing of the integrations on synthetic calendars,
+    and the fetching of the meetings and the setting of the statuses end to end, against local
+    stub servers of Google, Graph and Slack. The end to end benchmarks run the real integrations,
+    only their credentials are replaced. The results are written into a JSON file, and can
+    be compared to the results of an earlier run to catch regressions.
+
+    Usage: python3 bench/run.py [--suite micro|e2e|all] [--sizes <count>,...] [--runs <count>]
+        [--latency <ms>] [--rate-limit <percent>] [--page-size <count>] [--output <file>]
+        [--baseline <file>] [--tolerance <percent>]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+from datetime import datetime
+from typing import Callable, Dict, List, Set
+
+import synthetic
+
+# The directory of the script, the modules of the script are imported from there
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# The timezone of the synthetic user
+TIME_ZONE = 'Europe/Amsterdam'
+
+# The sizes of the synthetic calendars of the micro benchmarks (events or windows)
+MICRO_SIZES = [10, 100, 1000, 10000, 100000]
+
+# The sizes of the end to end benchmarks (events per calendar, or Slack workspaces)
+E2E_SIZES = [10, 100, 1000]
+
+# The access token sent to the stub servers of the calendar APIs
+STUB_TOKEN = 'bench'
+
+
+def measure(function: Callable[[], any], runs: int, warmup: bool = True) \
+        -> List[float | None]:
+    """
+    Measures the run time of a function
+
+    Parameters:
+    function: Callable[[], any] - The function to measure, returning False if the run
+        has failed
+    runs: int - The number of measured runs
+    warmup: bool - If set, the function is run once before the measured runs
+
+    Returns:
+    The run time of each run in seconds, None for the failed runs
+    """
+
+    if warmup:
+        function()
+
+    run_times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        succeeded = function() is not False
+        run_time = time.perf_counter() - start
+        run_times.append(run_time if succeeded else None)
+
+    return run_times
+
+
+def create_result(name: str, size: int, run_times: List[float | None]) -> Dict[str, any]:
+    """
+    Summarizes the run times of a benchmark, and prints the summary.
+    Only the successful runs are timed, the failed ones are counted.
+
+    Parameters:
+    name: str - The name of the benchmark
+    size: int - The size of the input
+    run_times: List[float | None] - The run times in seconds, see measure
+
+    Returns:
+    The result of the benchmark as a JSON serializable dictionary,
+    without times if every run has failed
+    """
+
+    successful_times = [run_time for run_time in run_times if run_time is not None]
+    result = {
+        'name': name,
+        'size': size,
+        'runs': len(run_times),
+        'failedRuns': len(run_times) - len(successful_times),
+        'minMs': min(successful_times) * 1000 if successful_times else None,
+        'medianMs': statistics.median(successful_times) * 1000 if successful_times else None,
+        'meanMs': statistics.mean(successful_times) * 1000 if successful_times else None
+    }
+
+    failures = f"  failed {result['failedRuns']}/{result['runs']}" if result['failedRuns'] else ''
+    if successful_times:
+        print(f"  {name:<32} {size:>7}  median {result['medianMs']:10.3f} ms  " +
+            f"min {result['minMs']:10.3f} ms{failures}")
+    else:
+        print(f"  {name:<32} {size:>7}  every run has failed")
+
+    return result
+
+
+def stub_credentials() -> None:
+    """
+    Replaces the credentials of the Google and Graph integrations with a static access token,
+    accepted by the stub servers, so the integrations run without logging in.
+    Everything else of the integrations (the clients, the paging, the parsing) is real.
+
+    Returns:
+    None
+    """
+
+    from azure.core.credentials import AccessToken
+    from google.oauth2.credentials import Credentials
+
+    from integrations import azure_teams, google_calendar
+
+    access_token = AccessToken(STUB_TOKEN, int(time.time()) + 24 * 3600)
+    setattr(google_calendar, '__get_credentials',
+        lambda *arguments: Credentials(token=STUB_TOKEN))
+    setattr(azure_teams, '__get_credential',
+        lambda *arguments: types.SimpleNamespace(get_token=lambda *scopes: access_token))
+
+
+def get_expected_meetings(google_events: List[Dict], teams_events: List[Dict],
+        window: tuple) -> Set[tuple]:
+    """
+    Calculates the meetings get_meetings_from_integrations returns from the synthetic events,
+    if every integration succeeds
+
+    Parameters:
+    google_events: List[Dict] - The events of the Google calendar
+    teams_events: List[Dict] - The events of the Graph calendar
+    window: tuple - The window of the meetings
+
+    Returns:
+    The meetings
+    """
+
+    import utils
+
+    return set(utils.parse_google_meetings(google_events, TIME_ZONE, window)) | \
+        set(utils.parse_teams_meetings(teams_events, TIME_ZONE, window))
+
+
+def run_micro_suite(sizes: List[int], runs: int) -> List[Dict[str, any]]:
+    """
+    Benchmarks the merging of the windows, the creation of the status message and the parsing
+    of the integrations' events on synthetic calendars of each size
+
+    Parameters:
+    sizes: List[int] - The numbers of windows or events
+    runs: int - The number of measured runs of each benchmark
+
+    Returns:
+    The results of the benchmarks, see create_result
+    """
+
+    import utils
+
+    from status_context import StatusContext
+
+    context = StatusContext({'localTimeZone': TIME_ZONE})
+    window = utils.get_day_bounds(TIME_ZONE)
+    day_start = synthetic.get_day_start(window[0].tzinfo)
+
+    results = []
+    for size in sizes:
+        windows = synthetic.generate_windows(size, day_start)
+        google_events = synthetic.generate_google_events(size, day_start)
+        teams_events = synthetic.generate_teams_events(size, day_start)
+
+        # A break splitting the window in the middle of the day
+        new_window = windows[size // 2]
+
+        results.extend([
+            create_result('add_new_window', size, measure(
+                lambda: utils.add_new_window(new_window, windows), runs)),
+            create_result('create_status_message', size, measure(
+                lambda: context.create_status_message(windows, windows), runs)),
+            create_result('parse_google_meetings', size, measure(
+                lambda: utils.parse_google_meetings(google_events, TIME_ZONE, window), runs)),
+            create_result('parse_teams_meetings', size, measure(
+                lambda: utils.parse_teams_meetings(teams_events, TIME_ZONE, window), runs))
+        ])
+
+    return results
+
+
+def run_e2e_suite(sizes: List[int], runs: int, latency: float, rate_limit: float = 0,
+        page_size: int = 250) -> List[Dict[str, any]]:
+    """
+    Benchmarks get_meetings_from_integrations with a Google and a Graph calendar of each size,
+    and set_slack_status with as many Slack workspaces as each size, against stub servers.
+    The real integrations are run (see stub_credentials), the Graph one in 'calendarView' mode,
+    so no state files are written. The snapshot cache is disabled, and the status file is
+    written into a temporary directory. A run fails if an integration or a workspace has failed
+    (f.e. on a rate limited request), the failed runs are counted instead of timed.
+
+    Parameters:
+    sizes: List[int] - The numbers of events per calendar, and of workspaces
+    runs: int - The number of measured runs of each benchmark
+    latency: float - The seconds the stub servers wait before answering a request
+    rate_limit: float - The share of the requests (from 0 to 1) answered as rate limited
+    page_size: int - The largest number of events the calendar stubs list on a page
+
+    Returns:
+    The results of the benchmarks, see create_result
+    """
+
+    import file
+    import script
+    import stub_servers
+    import utils
+
+    from status_context import StatusResult
+
+    stub_credentials()
+
+    window = utils.get_day_bounds(TIME_ZONE)
+    day_start = synthetic.get_day_start(window[0].tzinfo)
+    status = StatusResult('09:00 - 17:00', ':speech_balloon:', int(window[1].timestamp()))
+
+    results = []
+    options = {'latency': latency, 'rate_limit': rate_limit, 'retry_after': 0.1}
+    with tempfile.TemporaryDirectory() as temp_dir, \
+            stub_servers.create_slack_server(**options) as slack_server:
+        file.STATUS_FILE_PATH = os.path.join(temp_dir, 'status_cache.json')
+
+        for size in sizes:
+            google_events = synthetic.generate_google_events(size, day_start)
+            teams_events = synthetic.generate_teams_events(size, day_start)
+            with stub_servers.create_google_server(google_events, page_size=page_size,
+                        **options) as google_server, \
+                    stub_servers.create_graph_server(teams_events, page_size=page_size,
+                        **options) as graph_server:
+                # The name keeps the files of the integrations apart from the real ones
+                context = script.create_context({
+                    'name': f'bench{size}',
+                    'localTimeZone': TIME_ZONE,
+                    'snapshotCache': {'enabled': False},
+                    'integrations': {
+                        'google-calendar': [{'enabled': True, 'credentials': {},
+                            'baseUrl': f'{google_server.url}/calendar/v3/'}],
+                        'azure-teams': [{'enabled': True, 'credentials': {'user_id': 'bench'},
+                            'fetchMode': 'calendarView', 'baseUrl': f'{graph_server.url}/v1.0'}]
+                    }
+                })
+                expected_meetings = get_expected_meetings(google_events, teams_events, window)
+
+                # The logs of the integrations are not part of the results
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run_times = measure(lambda: set(script.get_meetings_from_integrations(
+                        context, window)) == expected_meetings, runs)
+                results.append(create_result('get_meetings_from_integrations', size, run_times))
+
+            context = script.create_context({
+                'localTimeZone': TIME_ZONE,
+                'skipUnchangedStatus': False,
+                'slackHttp': {'baseUrl': f'{slack_server.url}/api/', 'backoffBase': 0.1},
+                'slackApiTokens': [f'xoxp-bench-{index}' for index in range(size)],
+                'slackUserIds': [f'U{index:08d}' for index in range(size)]
+            })
+            results.append(create_result('set_slack_status', size, measure(
+                lambda: all(result.get('ok', False) for result in script.set_slack_status(
+                    context, status, report=False)), runs)))
+            context.slack_client.close()
+
+    return results
+
+
+def compare_results(results: List[Dict[str, any]], baseline: Dict[str, any],
+        tolerance: float) -> List[str]:
+    """
+    Compares the results to the results of an earlier run
+
+    Parameters:
+    results: List[Dict[str, any]] - The results of this run
+    baseline: Dict[str, any] - The content of the results file of the earlier run
+    tolerance: float - The allowed slowdown of the median in percent
+
+    Returns:
+    The descriptions of the benchmarks which have become slower than allowed
+    """
+
+    baseline_medians = {
+        (result['name'], result['size']): result['medianMs'] for result in baseline['results']
+    }
+
+    regressions = []
+    for result in results:
+        baseline_median = baseline_medians.get((result['name'], result['size']))
+        if result['medianMs'] is None:
+            regressions.append(f"{result['name']} ({result['size']}): every run has failed")
+        elif baseline_median and result['medianMs'] > baseline_median * (1 + tolerance / 100):
+            regressions.append(f"{result['name']} ({result['size']}): " +
+                f"{baseline_median:.3f} ms -> {result['medianMs']:.3f} ms")
+
+    return regressions
+
+
+def main() -> None:
+    """
+    Runs the benchmarks, writes the results file, and exits with 1 if a benchmark has
+    become slower than the baseline allows
+
+    Returns:
+    None
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmarks the status calculation.')
+    parser.add_argument('--suite', choices=['micro', 'e2e', 'all'], default='all',
+        help='the benchmarks to run')
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+        help='comma separated sizes of the calendars, default depends on the suite')
+    parser.add_argument('--runs', type=int, default=5, help='number of measured runs')
+    parser.add_argument('--latency', type=float, default=50,
+        help='latency of the stub servers in milliseconds')
+    parser.add_argument('--rate-limit', type=float, default=0,
+        help='share of the requests the stub servers answer as rate limited in percent')
+    parser.add_argument('--page-size', type=int, default=250,
+        help='largest number of events the calendar stubs list on a page')
+    parser.add_argument('--output', default=os.path.join(ROOT_DIR, 'bench_results.json'),
+        help='the file the results are written into')
+    parser.add_argument('--baseline', help='results file of an earlier run to compare to')
+    parser.add_argument('--tolerance', type=float, default=20,
+        help='allowed slowdown compared to the baseline in percent')
+    arguments = parser.parse_args()
+
+    runs = max(arguments.runs, 1)
+    results = []
+    if arguments.suite in ['micro', 'all']:
+        print("Micro benchmarks:")
+        results.extend(run_micro_suite(arguments.sizes or MICRO_SIZES, runs))
+    if arguments.suite in ['e2e', 'all']:
+        print(f"End to end benchmarks (latency of the servers: {arguments.latency:g} ms, " +
+            f"rate limited: {arguments.rate_limit:g}%, page size: {arguments.page_size}):")
+        results.extend(run_e2e_suite(arguments.sizes or E2E_SIZES, runs,
+            arguments.latency / 1000, arguments.rate_limit / 100, arguments.page_size))
+
+    with open(arguments.output, 'w') as output_file:
+        json.dump({
+            'createdAt': datetime.now().astimezone().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'latencyMs': arguments.latency,
+            'rateLimitPercent': arguments.rate_limit,
+            'pageSize': arguments.page_size,
+            'results': results
+        }, output_file, indent=2)
+    print(f"Results are written into {arguments.output}")
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            regressions = compare_results(results, json.load(baseline_file),
+                arguments.tolerance)
+
+        if regressions:
+            print(f"Slower than the baseline by more than {arguments.tolerance:g}%:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+        print("No regressions compared to the baseline")
+
+
+if __name__ == '__main__':
+    main()
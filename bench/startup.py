@@ -0,0 +1,119 @@
+"""
+    Measures the startup time of the script with 'python -X importtime', and checks that
+    the SDKs of the integrations are not imported at startup.
+
+    Usage: python3 bench/startup.py [--runs <count>] [--top <count>]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from typing import Dict, List, Tuple
+
+# The modules which must only be imported when an integration of theirs is enabled
+LAZY_MODULES = (
+    'integrations.google_calendar',
+    'integrations.azure_teams',
+    'googleapiclient',
+    'google_auth_oauthlib',
+    'google.oauth2',
+    'azure',
+    'msal'
+)
+
+# The directory of the script, the imports are measured from there
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Imports a module in a new interpreter with 'python -X importtime'
+
+    Parameters:
+    module: str - The name of the module to import
+
+    Returns:
+    The self and cumulative import time of each imported module in microseconds,
+    by the modules' names
+    """
+
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+
+    import_times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+
+        self_time, cumulative_time, name = line[len('import time:'):].split('|')
+        import_times[name.strip()] = (int(self_time), int(cumulative_time))
+
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1]
+        raise RuntimeError(f"Importing '{module}' has failed: {error}")
+
+    return import_times
+
+
+def get_lazy_violations(import_times: Dict[str, Tuple[int, int]]) -> List[str]:
+    """
+    Lists the modules imported at startup which should only be imported lazily
+
+    Parameters:
+    import_times: Dict[str, Tuple[int, int]] - The import times, see measure_import
+
+    Returns:
+    The names of the modules which should not have been imported
+    """
+
+    return [
+        name for name in import_times
+        if any(name == lazy or name.startswith(f'{lazy}.') for lazy in LAZY_MODULES)
+    ]
+
+
+def main() -> None:
+    """
+    Runs the benchmark, and exits with 1 if a lazy module was imported at startup
+
+    Returns:
+    None
+    """
+
+    parser = argparse.ArgumentParser(description='Measures the startup time of the script.')
+    parser.add_argument('--runs', type=int, default=5, help='number of measurements')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest modules listed')
+    arguments = parser.parse_args()
+
+    totals = []
+    import_times = {}
+    for _ in range(max(arguments.runs, 1)):
+        try:
+            import_times = measure_import('script')
+        except RuntimeError as error:
+            print(error)
+            sys.exit(1)
+
+        totals.append(import_times['script'][1])
+
+    print(f"Startup import time of the script (median of {len(totals)} runs): " +
+        f"{statistics.median(totals) / 1000:.1f} ms")
+
+    print("Slowest modules (cumulative, last run):")
+    slowest = sorted(import_times.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (_, cumulative_time) in slowest[:arguments.top]:
+        print(f"  {cumulative_time / 1000:8.1f} ms  {name}")
+
+    violations = get_lazy_violations(import_times)
+    if violations:
+        print(f"Imported at startup, but should be lazy: {', '.join(violations)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
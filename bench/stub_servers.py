@@ -0,0 +1,358 @@
+"""
+    Contains local stub HTTP servers standing in for the Slack, Google Calendar and
+    Microsoft Graph APIs, with a configurable latency, rate of rate limited (429) responses
+    and page size. They are used by the end to end benchmarks, and can be run on their own
+    to load test the script against them (see the 'baseUrl' settings of the config):
+
+    Usage: python3 bench/stub_servers.py [--host <host>] [--port <port>] [--latency <ms>]
+        [--rate-limit <percent>] [--retry-after <seconds>] [--page-size <count>]
+        [--events <count>] [--time-zone <zone>]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from zoneinfo import ZoneInfo
+
+import synthetic
+
+# A route handler: gets the path, the query parameters and the parsed body,
+# returns the status code and the response
+RouteHandler = Callable[[str, Dict[str, str], Dict | None], Tuple[int, Dict]]
+
+# The number of events listed on a page if the client does not ask for less
+DEFAULT_PAGE_SIZE = 250
+
+# The token of the (only) state of the stub calendars, returned as the sync and delta tokens
+SYNC_TOKEN = 'latest'
+
+
+class StubServer:
+    """
+    A local HTTP server answering on a thread of its own. Each route is matched by its
+    method and path prefix, and is answered after the latency. A share of the requests is
+    answered with a rate limited (429) response instead, with a Retry-After header.
+    """
+
+    def __init__(self, routes: List[Tuple[str, str, RouteHandler]] = None, latency: float = 0,
+            rate_limit: float = 0, retry_after: float = 1,
+            rate_limited_response: Dict = None, host: str = '127.0.0.1',
+            port: int = 0) -> None:
+        """
+        Parameters:
+        routes: List[Tuple[str, str, RouteHandler]] - The routes as (method, path prefix,
+            handler) tuples, the first matching one answers
+        latency: float - The seconds to wait before answering a request
+        rate_limit: float - The share of the requests (from 0 to 1) answered as rate limited
+        retry_after: float - The seconds sent in the Retry-After header of the 429 responses
+        rate_limited_response: Dict - The body of the 429 responses
+        host: str - The host name to listen on
+        port: int - The port to listen on, 0 to pick a free one
+        """
+
+        self.routes = routes or []
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.rate_limited_response = rate_limited_response or {'error': 'rate_limited'}
+
+        # Counters of the requests, see get_stats
+        self.stats = {'requests': 0, 'rate_limited': 0}
+        self.stats_lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer((host, port), self.__create_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self) -> 'StubServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the counters of the server
+
+        Returns:
+        A copy of the counters: number of requests received, and number of them answered
+        as rate limited
+        """
+
+        with self.stats_lock:
+            return dict(self.stats)
+
+    def answer(self, method: str, path: str, body: Dict | None) -> Tuple[int, Dict, Dict]:
+        """
+        Answers a request, after the latency
+
+        Parameters:
+        method: str - The HTTP method of the request
+        path: str - The path of the request, with the query string
+        body: Dict | None - The parsed JSON body of the request
+
+        Returns:
+        The status code, the headers and the body of the response
+        """
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        rate_limited = random.random() < self.rate_limit
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['rate_limited'] += int(rate_limited)
+
+        if rate_limited:
+            return 429, {'Retry-After': f'{self.retry_after:g}'}, self.rate_limited_response
+
+        url = urlsplit(path)
+        query = dict(parse_qsl(url.query))
+        for route_method, path_prefix, handler in self.routes:
+            if route_method == method and url.path.startswith(path_prefix):
+                status_code, response = handler(url.path, query, body)
+                return status_code, {}, response
+
+        return 404, {}, {'error': 'not_found'}
+
+    def __create_handler(self) -> type:
+        """
+        Creates the request handler class of the server
+
+        Returns:
+        The request handler class
+        """
+
+        stub_server = self
+
+        class StubRequestHandler(BaseHTTPRequestHandler):
+
+            # Keep the connections alive, so the clients' connection pools are used
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self) -> None:
+                self.respond(*stub_server.answer('GET', self.path, None))
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length) if length else b''
+                self.respond(*stub_server.answer('POST', self.path,
+                    json.loads(body) if body else None))
+
+            def respond(self, status_code: int, headers: Dict[str, str], response: Dict) -> None:
+                content = json.dumps(response).encode()
+                self.send_response(status_code)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return StubRequestHandler
+
+
+def get_page(items: List[Dict], offset: str | None, requested_size: str | None,
+        page_size: int) -> Tuple[List[Dict], int | None]:
+    """
+    Cuts a page out of a list
+
+    Parameters:
+    items: List[Dict] - The whole list
+    offset: str | None - The index of the page's first item, as sent by the client
+    requested_size: str | None - The page size asked for by the client
+    page_size: int - The largest page size of the server
+
+    Returns:
+    The items of the page, and the offset of the next page (None if it's the last page)
+    """
+
+    start = int(offset or 0)
+    end = start + min(int(requested_size or page_size), page_size)
+    return items[start:end], end if end < len(items) else None
+
+
+def create_slack_server(latency: float = 0, rate_limit: float = 0, retry_after: float = 1,
+        host: str = '127.0.0.1', port: int = 0) -> StubServer:
+    """
+    Creates a stub of the Slack API, accepting every users.profile.set request.
+    Its base URL ('slackHttp' > 'baseUrl') is '<url>/api/'.
+
+    Parameters:
+    latency: float - The seconds to wait before answering a request
+    rate_limit: float - The share of the requests (from 0 to 1) answered as rate limited
+    retry_after: float - The seconds sent in the Retry-After header of the 429 responses
+    host: str - The host name to listen on
+    port: int - The port to listen on, 0 to pick a free one
+
+    Returns:
+    The server, to be started with a 'with' statement
+    """
+
+    return StubServer([
+        ('POST', '/api/users.profile.set', lambda path, query, body: (200, {'ok': True}))
+    ], latency, rate_limit, retry_after, {'ok': False, 'error': 'ratelimited'}, host, port)
+
+
+def create_google_server(events: List[Dict], latency: float = 0, rate_limit: float = 0,
+        retry_after: float = 1, page_size: int = DEFAULT_PAGE_SIZE, host: str = '127.0.0.1',
+        port: int = 0) -> StubServer:
+    """
+    Creates a stub of the Google Calendar API, listing the events given on events.list
+    of every calendar, in pages (following 'pageToken'). A full list ends with a sync token,
+    and a list with the sync token has no changes. Its base URL ('baseUrl' of the integration)
+    is '<url>/calendar/v3/'.
+
+    Parameters:
+    events: List[Dict] - The events of every calendar
+    latency: float - The seconds to wait before answering a request
+    rate_limit: float - The share of the requests (from 0 to 1) answered as rate limited
+    retry_after: float - The seconds sent in the Retry-After header of the 429 responses
+    page_size: int - The largest number of events listed on a page
+    host: str - The host name to listen on
+    port: int - The port to listen on, 0 to pick a free one
+
+    Returns:
+    The server, to be started with a 'with' statement
+    """
+
+    def list_events(path: str, query: Dict[str, str], body: Dict | None) -> Tuple[int, Dict]:
+        if 'syncToken' in query:
+            return 200, {'items': [], 'nextSyncToken': SYNC_TOKEN}
+
+        page, next_offset = get_page(events, query.get('pageToken'), query.get('maxResults'),
+            page_size)
+        if next_offset is None:
+            return 200, {'items': page, 'nextSyncToken': SYNC_TOKEN}
+
+        return 200, {'items': page, 'nextPageToken': str(next_offset)}
+
+    return StubServer([
+        ('GET', '/calendar/v3/calendars/', list_events)
+    ], latency, rate_limit, retry_after,
+        {'error': {'code': 429, 'message': 'Rate Limit Exceeded'}}, host, port)
+
+
+def create_graph_server(events: List[Dict], latency: float = 0, rate_limit: float = 0,
+        retry_after: float = 1, page_size: int = DEFAULT_PAGE_SIZE, host: str = '127.0.0.1',
+        port: int = 0) -> StubServer:
+    """
+    Creates a stub of the Microsoft Graph API, listing the events given on calendarView,
+    calendarView/delta and calendar/events of every user, in pages (following
+    '@odata.nextLink'). A delta query ends with a delta link, which has no changes.
+    Its base URL ('baseUrl' of the integration) is '<url>/v1.0'.
+
+    Parameters:
+    events: List[Dict] - The events of every user
+    latency: float - The seconds to wait before answering a request
+    rate_limit: float - The share of the requests (from 0 to 1) answered as rate limited
+    retry_after: float - The seconds sent in the Retry-After header of the 429 responses
+    page_size: int - The largest number of events listed on a page
+    host: str - The host name to listen on
+    port: int - The port to listen on, 0 to pick a free one
+
+    Returns:
+    The server, to be started with a 'with' statement
+    """
+
+    server = StubServer(None, latency, rate_limit, retry_after,
+        {'error': {'code': 'TooManyRequests', 'message': 'Too many requests'}}, host, port)
+
+    def list_events(path: str, query: Dict[str, str], body: Dict | None) -> Tuple[int, Dict]:
+        is_delta = path.endswith('/delta')
+        if is_delta and '$deltatoken' in query:
+            return 200, {'value': [], '@odata.deltaLink': f'{server.url}{path}?' +
+                urlencode({'$deltatoken': SYNC_TOKEN})}
+
+        page, next_offset = get_page(events, query.get('$skip'), query.get('$top'), page_size)
+        response = {'value': page}
+        if next_offset is not None:
+            response['@odata.nextLink'] = f'{server.url}{path}?' + \
+                urlencode({**query, '$skip': next_offset})
+        elif is_delta:
+            response['@odata.deltaLink'] = f'{server.url}{path}?' + \
+                urlencode({'$deltatoken': SYNC_TOKEN})
+
+        return 200, response
+
+    server.routes = [('GET', '/v1.0/users/', list_events)]
+    return server
+
+
+def main() -> None:
+    """
+    Runs the stub servers of Slack (on the port given), Google Calendar (on the next port)
+    and Microsoft Graph (on the one after), until the process is interrupted
+
+    Returns:
+    None
+    """
+
+    parser = argparse.ArgumentParser(description='Runs stub servers of Slack, Google and Graph.')
+    parser.add_argument('--host', default='127.0.0.1', help='the host name to listen on')
+    parser.add_argument('--port', type=int, default=8100,
+        help='port of the Slack stub, Google and Graph listen on the next two')
+    parser.add_argument('--latency', type=float, default=50,
+        help='latency of the responses in milliseconds')
+    parser.add_argument('--rate-limit', type=float, default=0,
+        help='share of the requests answered as rate limited (429) in percent')
+    parser.add_argument('--retry-after', type=float, default=1,
+        help='seconds sent in the Retry-After header of the rate limited responses')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+        help='largest number of events listed on a page')
+    parser.add_argument('--events', type=int, default=20,
+        help='number of events of today in every calendar')
+    parser.add_argument('--time-zone', default='Europe/Amsterdam',
+        help='timezone of the calendars\' day')
+    arguments = parser.parse_args()
+
+    day_start = synthetic.get_day_start(ZoneInfo(arguments.time_zone))
+    options = {
+        'latency': arguments.latency / 1000,
+        'rate_limit': arguments.rate_limit / 100,
+        'retry_after': arguments.retry_after,
+        'host': arguments.host
+    }
+
+    with create_slack_server(port=arguments.port, **options) as slack_server, \
+            create_google_server(synthetic.generate_google_events(arguments.events, day_start),
+                page_size=arguments.page_size, port=arguments.port + 1,
+                **options) as google_server, \
+            create_graph_server(synthetic.generate_teams_events(arguments.events, day_start),
+                page_size=arguments.page_size, port=arguments.port + 2,
+                **options) as graph_server:
+        print(f"Slack:           {slack_server.url}/api/  ('slackHttp' > 'baseUrl')")
+        print(f"Google Calendar: {google_server.url}/calendar/v3/  ('baseUrl' of the integration)")
+        print(f"Microsoft Graph: {graph_server.url}/v1.0  ('baseUrl' of the integration)")
+        print("Press Ctrl+C to stop")
+
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+        for name, server in [('Slack', slack_server), ('Google Calendar', google_server),
+                ('Microsoft Graph', graph_server)]:
+            stats = server.get_stats()
+            print(f"{name}: {stats['requests']} requests, {stats['rate_limited']} rate limited")
+
+
+if __name__ == '__main__':
+    main()
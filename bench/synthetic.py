@@ -0,0 +1,111 @@
+"""
+    Contains the generators of the synthetic calendars used by the benchmarks
+"""
+
+import random
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+# The synthetic data is the same on every run
+SEED = 42
+
+
+def get_day_start(time_zone) -> datetime:
+    """
+    Returns the start of today in a timezone
+
+    Parameters:
+    time_zone: tzinfo - The timezone
+
+    Returns:
+    The timezone aware start of today
+    """
+
+    return datetime.now(time_zone).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def generate_windows(count: int, day_start: datetime) -> List[Tuple[datetime, datetime]]:
+    """
+    Generates disjoint, sorted time windows spread over a day
+
+    Parameters:
+    count: int - The number of windows
+    day_start: datetime - The start of the day
+
+    Returns:
+    The windows
+    """
+
+    step = timedelta(days=1) / (count * 2)
+    return [
+        (day_start + step * (index * 2), day_start + step * (index * 2 + 1))
+        for index in range(count)
+    ]
+
+
+def generate_google_events(count: int, day_start: datetime) -> List[Dict]:
+    """
+    Generates events in the format of the Google Calendar API, starting during the day.
+    Some of them are cancelled, transparent or all day events.
+
+    Parameters:
+    count: int - The number of events
+    day_start: datetime - The start of the day
+
+    Returns:
+    The events
+    """
+
+    generator = random.Random(SEED)
+    events = []
+    for index in range(count):
+        start = day_start + timedelta(seconds=generator.randrange(0, 86400 - 3600))
+        end = start + timedelta(minutes=generator.choice([15, 30, 45, 60]))
+        event = {
+            'id': f'google-{index}',
+            'status': 'cancelled' if index % 50 == 0 else 'confirmed',
+            'start': {'dateTime': start.isoformat()},
+            'end': {'dateTime': end.isoformat()}
+        }
+
+        if index % 20 == 0:
+            event['transparency'] = 'transparent'
+        if index % 100 == 1:
+            event['start'] = {'date': day_start.date().isoformat()}
+            event['end'] = {'date': (day_start + timedelta(days=1)).date().isoformat()}
+
+        events.append(event)
+
+    return events
+
+
+def generate_teams_events(count: int, day_start: datetime) -> List[Dict]:
+    """
+    Generates events in the format of the Microsoft Graph API, starting during the day,
+    in UTC with the fractional seconds Graph sends. Some of them are cancelled or free.
+
+    Parameters:
+    count: int - The number of events
+    day_start: datetime - The start of the day
+
+    Returns:
+    The events
+    """
+
+    generator = random.Random(SEED)
+    events = []
+    for index in range(count):
+        start = day_start + timedelta(seconds=generator.randrange(0, 86400 - 3600))
+        end = start + timedelta(minutes=generator.choice([15, 30, 45, 60]))
+        start_utc = start.astimezone(timezone.utc).replace(tzinfo=None)
+        end_utc = end.astimezone(timezone.utc).replace(tzinfo=None)
+        events.append({
+            'id': f'teams-{index}',
+            'isCancelled': index % 50 == 0,
+            'showAs': 'free' if index % 20 == 0 else 'busy',
+            'start': {'dateTime': start_utc.isoformat() + '.0000000', 'timeZone': 'UTC'},
+            'end': {'dateTime': end_utc.isoformat() + '.0000000', 'timeZone': 'UTC'}
+        })
+
+    return events
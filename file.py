@@ -5,10 +5,16 @@
 import json
 import os
 import sys
+import threading
 
 from typing import Dict
 
 CONFIG_FILE_PATH = 'config.json'
+STATUS_FILE_PATH = 'status_cache.json'
+SCHEDULE_FILE_PATH = 'schedule.json'
+
+# Serializes the updates of the status file between the threads of the process
+__status_file_lock = threading.Lock()
 
 
 def read_configuration() -> Dict[str, any]:
@@ -35,6 +41,30 @@ def read_configuration() -> Dict[str, any]:
     return read_json_file(abs_file_path)
 
 
+def read_roster_file(filename: str) -> Dict[str, any]:
+    """
+    Checks and reads in the roster file of the batch mode
+
+    Parameters:
+    filename: str - The path of the roster file
+
+    Returns:
+    The roster in a dictionary form
+    """
+
+    # Check if roster file exists
+    if not os.path.isfile(filename):
+        print(f"Roster file '{filename}' is not present!")
+        sys.exit(1)
+
+    roster = read_json_file(filename)
+    if not isinstance(roster.get('users'), list):
+        print(f"Roster file '{filename}' has no 'users' list!")
+        sys.exit(1)
+
+    return roster
+
+
 def read_json_file(filename: str) -> Dict[str, any]:
     """
     Reads json file into a dictionary
@@ -48,3 +78,109 @@ def read_json_file(filename: str) -> Dict[str, any]:
 
     with open(filename) as f_in:
         return json.load(f_in)
+
+
+def read_status_file() -> Dict[str, Dict[str, str]]:
+    """
+    Reads the status file, containing the last status set for each workspace
+
+    Returns:
+    The content of the status file, keyed by the workspace keys.
+    An empty dictionary if the file does not exist or is not readable.
+    """
+
+    abs_file_path = os.path.join(os.path.dirname(__file__), STATUS_FILE_PATH)
+    if not os.path.isfile(abs_file_path):
+        return {}
+
+    try:
+        return read_json_file(abs_file_path)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_status_file(status_cache: Dict[str, Dict[str, str]]) -> None:
+    """
+    Writes the status file. The file is replaced atomically, so an interrupted
+    run does not leave a half written file behind.
+
+    Parameters:
+    status_cache: Dict[str, Dict[str, str]] - The statuses to save, keyed by the workspace keys
+
+    Returns:
+    None
+    """
+
+    abs_file_path = os.path.join(os.path.dirname(__file__), STATUS_FILE_PATH)
+    write_json_file(abs_file_path, status_cache)
+
+
+def read_schedule_file() -> Dict[str, any] | None:
+    """
+    Reads the schedule file, containing the statuses planned in advance
+
+    Returns:
+    The content of the schedule file, None if the file does not exist or is not readable
+    """
+
+    abs_file_path = os.path.join(os.path.dirname(__file__), SCHEDULE_FILE_PATH)
+    if not os.path.isfile(abs_file_path):
+        return None
+
+    try:
+        return read_json_file(abs_file_path)
+    except (OSError, ValueError):
+        return None
+
+
+def write_schedule_file(schedule: Dict[str, any]) -> None:
+    """
+    Writes the schedule file, replacing it atomically
+
+    Parameters:
+    schedule: Dict[str, any] - The statuses planned in advance
+
+    Returns:
+    None
+    """
+
+    abs_file_path = os.path.join(os.path.dirname(__file__), SCHEDULE_FILE_PATH)
+    write_json_file(abs_file_path, schedule)
+
+
+def update_status_file(entries: Dict[str, Dict[str, str]]) -> None:
+    """
+    Adds the entries to the status file. The file is re-read under a lock,
+    so the entries written concurrently by other threads are not lost.
+
+    Parameters:
+    entries: Dict[str, Dict[str, str]] - The statuses to save, keyed by the workspace keys
+
+    Returns:
+    None
+    """
+
+    with __status_file_lock:
+        status_cache = read_status_file()
+        status_cache.update(entries)
+        write_status_file(status_cache)
+
+
+def write_json_file(filename: str, content: Dict[str, any]) -> None:
+    """
+    Writes a dictionary into a json file, replacing the file atomically.
+    Each thread writes its own temporary file, so concurrent writers don't mix their content.
+
+    Parameters:
+    filename: str - The path of the file
+    content: Dict[str, any] - The content to write
+
+    Returns:
+    None
+    """
+
+    temp_file_path = f'{filename}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp_file_path, 'w') as f_out:
+        json.dump(content, f_out, indent=4)
+
+    os.replace(temp_file_path, filename)
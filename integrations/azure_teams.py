@@ -1,37 +1,115 @@
-from typing import Dict, List
+import os.path
+import threading
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from zoneinfo import ZoneInfo
 
 import requests
 
-from azure.identity import InteractiveBrowserCredential
+from azure.identity import (AuthenticationRecord, AuthenticationRequiredError,
+    InteractiveBrowserCredential, TokenCachePersistenceOptions)
+
+import file
+import utils
+
+from integrations.provider import CalendarProvider
+from intervals import Interval
 
 # Define the scopes for Microsoft Graph API
 SCOPES = ['https://graph.microsoft.com/.default']
 
+GRAPH_API_URL = 'https://graph.microsoft.com/v1.0'
+
+# Seconds to wait for a response of the Graph API
+REQUEST_TIMEOUT = 30
+
+# The only event properties needed to calculate the meetings
+EVENT_FIELDS = 'start,end,showAs,isCancelled'
+
+# Number of events requested per page
+PAGE_SIZE = 100
+
+# Shared by every integration (and every user in batch mode), so the connections are reused
+__session = requests.Session()
+
+# The credentials by authentication record path, reused for the lifetime of the process
+__credentials = {}
+__credentials_lock = threading.Lock()
 
-def get_meetings(config_credentials: Dict) -> List[Dict]:
+
+class AzureTeamsProvider(CalendarProvider):
+    """
+    The provider of an 'azure-teams' integration
     """
-        Connects to the Azure Teams App, authenticates via web browser,
-        and returns all calendar events for the user
+
+    display_name = 'Azure Teams API'
+
+    def fetch_meetings(self, window: Interval) -> List[Interval]:
+        teams_meetings = get_meetings(
+            self.integration_config['credentials'],
+            self.index,
+            self.time_zone,
+            fetch_mode=self.integration_config.get('fetchMode', 'delta'),
+            allow_unencrypted_cache=self.integration_config.get(
+                'allowUnencryptedTokenCache', False),
+            window=window,
+            base_url=self.integration_config.get('baseUrl', GRAPH_API_URL),
+            interactive=self.interactive
+        )
+
+        return utils.parse_teams_meetings(teams_meetings, self.time_zone, window)
+
+
+def get_meetings(config_credentials: Dict, index: int | str, time_zone: str,
+        fetch_mode: str = 'delta', allow_unencrypted_cache: bool = False,
+        window: Tuple[datetime, datetime] = None, base_url: str = GRAPH_API_URL,
+        interactive: bool = False) -> List[Dict]:
+    """
+        Connects to the Azure Teams App, authenticates (via web browser on the first run only),
+        and returns the calendar events for the user
 
         Parameters:
         config_credentials: Dict - The credentials required for authentication
+        index: int | str - A simple index of the azure teams integrations list. Used to identify
+            the delta files created, so they don't get mixed up.
+        time_zone: str - The timezone (f.e. 'Europe/Amsterdam') used to determine today's window
+        fetch_mode: str - How the events are fetched:
+            'delta' - only the window's events, with only the changes since the last run
+                downloaded (using the delta link of the calendar view, stored in
+                azure_delta_{index}.json)
+            'calendarView' - only the window's events, with only the properties needed, and
+                their times already converted to the timezone by the server
+            'events' - all the events of the user's calendar
+        allow_unencrypted_cache: bool - If set, the persistent token cache is stored in plain
+            text when no encryption is available (f.e. on a Linux server without a keyring)
+        window: Tuple[datetime, datetime] - The timezone aware start and end of the calendar
+            view, default is today
+        base_url: str - The base URL of the Graph API (f.e. of a mock server)
+        interactive: bool - If set, the user is asked to log in via web browser when the
+            tokens can't be acquired silently
 
         Returns:
         A list of event dictionaries from the Microsoft Azure API
-    """
 
-    # Create the InteractiveBrowserCredential
-    interactive_cred = InteractiveBrowserCredential(
-        client_id=config_credentials['client_id'],
-        tenant_id=config_credentials['tenant_id']
-    )
+        Raises:
+        AuthenticationRequiredError - If the user has to log in, but the run is not interactive
+        requests.RequestException - If the events can't be retrieved
+        LookupError - If the delta link has expired, and the resynchronization has failed too
+    """
 
-    # Get access token
-    access_token = interactive_cred.get_token('https://graph.microsoft.com/.default').token
+    # Get access token, silently if possible
+    interactive_cred = __get_credential(
+        config_credentials, index, allow_unencrypted_cache, interactive)
+    try:
+        access_token = interactive_cred.get_token(*SCOPES).token
+    except AuthenticationRequiredError:
+        if not interactive:
+            raise
 
-    # Define endpoint to get calendar events
-    graph_api_endpoint = 'https://graph.microsoft.com/v1.0/users/' + \
-        f'{config_credentials["user_id"]}/calendar/events'
+        # The tokens can't be refreshed anymore, the user has to log in again
+        __save_authentication_record(index, interactive_cred.authenticate(scopes=SCOPES))
+        access_token = interactive_cred.get_token(*SCOPES).token
 
     # Prepare request headers
     headers = {
@@ -39,12 +117,284 @@ def get_meetings(config_credentials: Dict) -> List[Dict]:
         'Content-Type': 'application/json'
     }
 
-    # Make a GET request to retrieve calendar events
-    response = requests.get(graph_api_endpoint, headers=headers)
+    users_url = f'{base_url.rstrip("/")}/users/{config_credentials["user_id"]}'
+    if fetch_mode == 'delta':
+        return __get_meetings_delta(
+            headers, users_url, index, __get_day_window(time_zone, window))
+
+    if fetch_mode == 'calendarView':
+
+        # Only the window's events with the required fields, in the local timezone
+        window = __get_day_window(time_zone, window)
+        graph_api_endpoint = f'{users_url}/calendarView'
+        params = {
+            'startDateTime': window[0],
+            'endDateTime': window[1],
+            '$select': EVENT_FIELDS,
+            '$top': PAGE_SIZE
+        }
+        headers['Prefer'] = f'outlook.timezone="{time_zone}"'
 
-    # Check if the request was successful
-    if response.status_code == 200:
-        return response.json()['value']
     else:
-        print(f"Failed to retrieve calendar events: {response.text}")
-        return []
+
+        # Define endpoint to get calendar events
+        graph_api_endpoint = f'{users_url}/calendar/events'
+        params = None
+
+    # Retrieve all pages of the calendar events
+    try:
+        return __get_all_pages(graph_api_endpoint, headers, params)
+    except requests.RequestException as error:
+        print(f"Failed to retrieve calendar events: {error}")
+        raise
+
+
+def __get_credential(config_credentials: Dict, index: int, allow_unencrypted_cache: bool,
+        interactive: bool) -> InteractiveBrowserCredential:
+    """
+        Returns the credential of the integration. The tokens are kept in a persistent MSAL
+        token cache, and the account is remembered in the azure_auth_record_{index}.json file,
+        so only the first run needs the web browser, later runs refresh the tokens silently.
+        The credential never opens the web browser on its own, see get_meetings.
+
+        Parameters:
+        config_credentials: Dict - The credentials required for authentication
+        index: int - The index of the azure teams integration, identifies the token cache
+        allow_unencrypted_cache: bool - If set, the token cache can be stored in plain text
+        interactive: bool - If set, the user logs in via web browser if it's the first run
+
+        Returns:
+        The credential
+
+        Raises:
+        AuthenticationRequiredError - If it's the first run, but the run is not interactive
+    """
+
+    abs_record_path = __get_authentication_record_path(index)
+
+    with __credentials_lock:
+        interactive_cred = __credentials.get(abs_record_path)
+        if interactive_cred:
+            return interactive_cred
+
+        authentication_record = None
+        if os.path.exists(abs_record_path):
+            with open(abs_record_path) as record_file:
+                authentication_record = AuthenticationRecord.deserialize(record_file.read())
+        elif not interactive:
+            raise AuthenticationRequiredError(SCOPES, message="The user has not logged in yet, " +
+                "run the script interactively once to log in")
+
+        # Create the InteractiveBrowserCredential
+        interactive_cred = InteractiveBrowserCredential(
+            client_id=config_credentials['client_id'],
+            tenant_id=config_credentials['tenant_id'],
+            authentication_record=authentication_record,
+            disable_automatic_authentication=True,
+            cache_persistence_options=TokenCachePersistenceOptions(
+                name=f'slack_auto_status_teams_{index}',
+                allow_unencrypted_storage=allow_unencrypted_cache
+            )
+        )
+
+        # Log in via web browser for the first time, and remember the account for the next runs
+        if authentication_record is None:
+            __save_authentication_record(index, interactive_cred.authenticate(scopes=SCOPES))
+
+        __credentials[abs_record_path] = interactive_cred
+        return interactive_cred
+
+
+def __save_authentication_record(index: int, authentication_record: AuthenticationRecord) \
+        -> None:
+    """
+        Remembers the account the user has logged in with, for the next runs
+
+        Parameters:
+        index: int - The index of the azure teams integration, identifies the record file
+        authentication_record: AuthenticationRecord - The account
+
+        Returns:
+        None
+    """
+
+    with open(__get_authentication_record_path(index), 'w') as record_file:
+        record_file.write(authentication_record.serialize())
+
+
+def __get_authentication_record_path(index: int) -> str:
+    """
+        Constructs the path of the authentication record file of the integration
+
+        Parameters:
+        index: int - The index of the azure teams integration
+
+        Returns:
+        The absolute path of the authentication record file
+    """
+
+    script_dir = os.path.dirname(__file__)
+    return os.path.join(script_dir, f"azure_auth_record_{index}.json")
+
+
+def __get_all_pages(url: str, headers: Dict[str, str], params: Dict[str, any] | None) \
+        -> List[Dict]:
+    """
+        Gets a collection from the Graph API, following the next links of the pages
+
+        Parameters:
+        url: str - The url of the collection
+        headers: Dict[str, str] - The headers of the requests, with the authorization
+        params: Dict[str, any] | None - The query parameters of the first request
+
+        Returns:
+        The items of all the pages
+
+        Raises:
+        requests.HTTPError - If a request has failed
+    """
+
+    items = []
+    while url:
+        response = __session.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+
+        response_json = response.json()
+        items.extend(response_json.get('value', []))
+
+        # The next pages' links already contain the query parameters
+        params = None
+        url = response_json.get('@odata.nextLink')
+
+    return items
+
+
+def __get_day_window(time_zone: str, window: Tuple[datetime, datetime] | None) \
+        -> Tuple[str, str]:
+    """
+        Calculates the boundaries of the window, by default of today in the timezone given
+
+        Parameters:
+        time_zone: str - The timezone string (f.e. 'Europe/Amsterdam')
+        window: Tuple[datetime, datetime] | None - The timezone aware window, today if it's None
+
+        Returns:
+        The start and end of the window, as UTC ISO 8601 strings
+    """
+
+    if window:
+        day_start, day_end = window
+    else:
+        day_start = datetime.now(ZoneInfo(time_zone)).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        day_end = day_start + timedelta(days=1)
+
+    utc = ZoneInfo('UTC')
+    return (
+        day_start.astimezone(utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        day_end.astimezone(utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    )
+
+
+def __get_meetings_delta(headers: Dict[str, str], user_url: str, index: int,
+        window: Tuple[str, str]) -> List[Dict]:
+    """
+        Synchronizes the locally stored events of the window with a delta query of the
+        calendar view. The first run of a window downloads all of its events, later runs only
+        download the changes. The delta link and the events are stored in azure_delta_{index}.json
+
+        Parameters:
+        headers: Dict[str, str] - The headers of the requests, with the authorization
+        user_url: str - The URL of the user whose calendar is read
+        index: int - The index of the azure teams integration, identifies the delta file
+        window: Tuple[str, str] - The start and end of the calendar view, in ISO 8601 format
+
+        Returns:
+        A list of the event dictionaries in the window
+
+        Raises:
+        requests.RequestException - If the changes can't be retrieved, the state is kept then
+        LookupError - If the delta link has expired, and the resynchronization has failed too
+    """
+
+    # Read the state of the previous run, it is only valid for the same window.
+    # An unreadable state starts the synchronization over.
+    script_dir = os.path.dirname(__file__)
+    abs_delta_path = os.path.join(script_dir, f"azure_delta_{index}.json")
+    delta_state = {}
+    if os.path.exists(abs_delta_path):
+        try:
+            delta_state = file.read_json_file(abs_delta_path)
+        except (OSError, ValueError):
+            print(f"The delta file {abs_delta_path} is not readable, doing a full sync")
+
+    if delta_state.get('window') != list(window) or not delta_state.get('deltaLink'):
+        delta_state = {'window': list(window), 'deltaLink': None, 'events': {}}
+
+    try:
+        try:
+            delta_state['deltaLink'] = __apply_delta(
+                headers, user_url, window, delta_state['events'], delta_state['deltaLink'])
+
+        except LookupError:
+
+            # The delta link has expired, the synchronization has to start over
+            delta_state['events'] = {}
+            delta_state['deltaLink'] = __apply_delta(
+                headers, user_url, window, delta_state['events'], None)
+
+    # The resynchronization can fail the same way as the first attempt
+    except (requests.RequestException, LookupError) as error:
+        print(f"Failed to retrieve calendar events: {error}")
+        raise
+
+    # Save the state for the next run
+    file.write_json_file(abs_delta_path, delta_state)
+
+    return list(delta_state['events'].values())
+
+
+def __apply_delta(headers: Dict[str, str], user_url: str, window: Tuple[str, str],
+        events: Dict[str, Dict], delta_link: str | None) -> str:
+    """
+        Follows the pages of a calendar view delta query, and applies the changes to the events
+
+        Parameters:
+        headers: Dict[str, str] - The headers of the requests, with the authorization
+        user_url: str - The URL of the user whose calendar is read
+        window: Tuple[str, str] - The start and end of the calendar view, in ISO 8601 format
+        events: Dict[str, Dict] - The stored events by their ids, updated in place
+        delta_link: str | None - The delta link of the previous run, if there is one
+
+        Returns:
+        The delta link to use on the next run
+
+        Raises:
+        LookupError - If the delta link has expired
+        requests.HTTPError - If a request has failed
+    """
+
+    if delta_link:
+        url, params = delta_link, None
+    else:
+        url = f'{user_url}/calendarView/delta'
+        params = {'startDateTime': window[0], 'endDateTime': window[1]}
+
+    while True:
+        response = __session.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 410:
+            raise LookupError('The delta link has expired')
+        response.raise_for_status()
+
+        response_json = response.json()
+        for event in response_json.get('value', []):
+            if '@removed' in event:
+                events.pop(event['id'], None)
+            else:
+                events[event['id']] = event
+
+        # The next pages' links already contain the query parameters
+        params = None
+        url = response_json.get('@odata.nextLink')
+        if not url:
+            return response_json.get('@odata.deltaLink')
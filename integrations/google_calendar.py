@@ -1,7 +1,9 @@
 import datetime
 import os.path
+import threading
 
-from typing import Dict, List
+from typing import Dict, List, Tuple
+from zoneinfo import ZoneInfo
 
 import google
 from google.auth.transport.requests import Request
@@ -10,29 +12,172 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+import file
+import utils
+
+from integrations.provider import CalendarProvider
+from intervals import Interval
+
 # If modifying these scopes, delete the file google_token.json.
 SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
 
+# The only event fields needed to calculate the meetings
+EVENT_FIELDS = "items(id,status,transparency,start,end)"
+
+# Number of events requested per page (the maximum allowed by the API is 2500)
+PAGE_SIZE = 250
+
+# The built Calendar API services with their credentials, by token file path and base URL.
+# Kept for the lifetime of the process, so a long running process builds each only once.
+__services = {}
+__services_lock = threading.Lock()
+
+
+class LoginRequiredError(Exception):
+    """
+    Raised when the user has to log in via web browser, but the run is not interactive
+    """
+
+
+class GoogleCalendarProvider(CalendarProvider):
+    """
+    The provider of a 'google-calendar' integration
+    """
+
+    display_name = 'Google Calendar API'
+
+    def fetch_meetings(self, window: Interval) -> List[Interval]:
+        google_meetings = get_meetings(
+            self.integration_config['credentials'],
+            self.index,
+            self.time_zone,
+            calendar_ids=self.integration_config.get('calendarIds'),
+            incremental=self.integration_config.get('incrementalSync', False),
+            window=window,
+            base_url=self.integration_config.get('baseUrl'),
+            interactive=self.interactive
+        )
+
+        return utils.parse_google_meetings(google_meetings, self.time_zone, window)
 
-def get_meetings(config_credentials: Dict, index: int) -> List[Dict]:
+
+def get_meetings(config_credentials: Dict, index: int | str, time_zone: str,
+        calendar_ids: List[str] = None, incremental: bool = False,
+        window: Tuple[datetime.datetime, datetime.datetime] = None,
+        base_url: str = None, interactive: bool = False) -> List[Dict]:
     """
-        Connects to the Google Calendar API, authenticates via web browser,
-        and returns the next 10 events (meetings) for the user
+        Connects to the Google Calendar API, authenticates (via web browser, if there are no
+        usable tokens), and returns the events (meetings) of the window (today by default)
+        for the user
 
         Parameters:
         config_credentials: Dict - The credentials required for authentication
-        index: int - A simple index of the google calender integrations list. Used to identify
-            token files created, so they don't get mixed up.
+        index: int | str - A simple index of the google calender integrations list. Used to
+            identify token files created, so they don't get mixed up.
+        time_zone: str - The timezone (f.e. 'Europe/Amsterdam') used to determine today's window
+        calendar_ids: List[str] - The ids of the calendars to read, default is the primary one
+        incremental: bool - If set, only the changes since the last run are fetched
+            (using the sync token of the Calendar API), and applied to the events stored
+            locally. All upcoming events are returned in this case, not only the window's.
+        window: Tuple[datetime, datetime] - The timezone aware start and end of the events
+            listed, default is today
+        base_url: str - The base URL of the Calendar API (f.e. of a mock server),
+            default is the one of the discovery document
+        interactive: bool - If set, the user is asked to log in via web browser when there
+            are no usable tokens
 
         Returns:
         A list of event dictionaries from the Google Calendar API
+
+        Raises:
+        LoginRequiredError - If the user has to log in, but the run is not interactive
     """
 
-    creds = None
+    try:
+        service = __get_service(config_credentials, index, base_url, interactive)
 
-    # Construct absolute path by using this script's location
-    script_dir = os.path.dirname(__file__)
-    abs_token_path = os.path.join(script_dir, f"google_token_{index}.json")
+        events = []
+        for calendar_id in calendar_ids or ["primary"]:
+            if incremental:
+                events.extend(__sync_events(service, index, calendar_id))
+            else:
+                events.extend(__list_events(service, calendar_id, time_zone, window))
+
+        return events
+
+    except HttpError as error:
+        print(f"An error occurred: {error}")
+        raise
+
+
+def __get_service(config_credentials: Dict, index: int, base_url: str = None,
+        interactive: bool = False):
+    """
+        Returns the Calendar API service of the integration. The service is built once
+        (from the discovery document bundled with the client library, without fetching it),
+        and reused as long as its credentials are valid or can be refreshed.
+
+        Parameters:
+        config_credentials: Dict - The credentials required for authentication
+        index: int - The index of the google calender integration, identifies the token file
+        base_url: str - The base URL of the Calendar API, with the service path
+            (f.e. 'http://localhost:8101/calendar/v3/'), default is the one of the
+            discovery document
+        interactive: bool - If set, the user can be asked to log in via web browser
+
+        Returns:
+        The Calendar API service
+
+        Raises:
+        LoginRequiredError - If the user has to log in, but the run is not interactive
+    """
+
+    abs_token_path = __get_token_path(index)
+    service_key = (abs_token_path, base_url)
+    with __services_lock:
+        creds, service = __services.get(service_key, (None, None))
+
+    # Refresh the expired credentials of the cached service in place
+    if creds and not creds.valid and creds.expired and creds.refresh_token:
+        try:
+            creds.refresh(Request())
+            __save_credentials(creds, abs_token_path)
+        except google.auth.exceptions.RefreshError:
+            creds = None
+
+    if creds and creds.valid:
+        return service
+
+    creds = __get_credentials(config_credentials, abs_token_path, interactive)
+    service = build(
+        "calendar", "v3", credentials=creds, static_discovery=True, cache_discovery=False,
+        client_options={"api_endpoint": base_url.rstrip("/") + "/"} if base_url else None)
+
+    with __services_lock:
+        __services[service_key] = (creds, service)
+
+    return service
+
+
+def __get_credentials(config_credentials: Dict, abs_token_path: str,
+        interactive: bool = False) -> Credentials:
+    """
+        Reads the credentials from the token file, refreshes them if they have expired,
+        or lets the user log in via web browser if there are no usable credentials
+
+        Parameters:
+        config_credentials: Dict - The credentials required for authentication
+        abs_token_path: str - The path of the token file
+        interactive: bool - If set, the user can be asked to log in via web browser
+
+        Returns:
+        The valid credentials
+
+        Raises:
+        LoginRequiredError - If the user has to log in, but the run is not interactive
+    """
+
+    creds = None
 
     # The file google_token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first time.
@@ -45,38 +190,215 @@ def get_meetings(config_credentials: Dict, index: int) -> List[Dict]:
             try:
                 creds.refresh(Request())
             except google.auth.exceptions.RefreshError:
-                flow = InstalledAppFlow.from_client_config(
-                    config_credentials, SCOPES
-                )
-                creds = flow.run_local_server(port=0)
+                creds = __log_in(config_credentials, interactive)
         else:
-            flow = InstalledAppFlow.from_client_config(
-                config_credentials, SCOPES
-            )
-            creds = flow.run_local_server(port=0)
+            creds = __log_in(config_credentials, interactive)
         # Save the credentials for the next run
-        with open(abs_token_path, "w") as token:
-            token.write(creds.to_json())
+        __save_credentials(creds, abs_token_path)
 
-    try:
-        service = build("calendar", "v3", credentials=creds)
+    return creds
+
+
+def __log_in(config_credentials: Dict, interactive: bool) -> Credentials:
+    """
+        Lets the user log in via web browser
+
+        Parameters:
+        config_credentials: Dict - The credentials required for authentication
+        interactive: bool - If not set, nobody is there to log in, so the login fails
+
+        Returns:
+        The credentials of the user
+
+        Raises:
+        LoginRequiredError - If the run is not interactive
+    """
+
+    if not interactive:
+        raise LoginRequiredError("The Google tokens are missing or can't be refreshed, " +
+            "run the script interactively once to log in")
+
+    flow = InstalledAppFlow.from_client_config(
+        config_credentials, SCOPES
+    )
+    return flow.run_local_server(port=0)
+
+
+def __save_credentials(creds: Credentials, abs_token_path: str) -> None:
+    """
+        Saves the credentials into the token file for the next run
+
+        Parameters:
+        creds: Credentials - The credentials to save
+        abs_token_path: str - The path of the token file
+
+        Returns:
+        None
+    """
+
+    with open(abs_token_path, "w") as token:
+        token.write(creds.to_json())
+
+
+def __get_token_path(index: int) -> str:
+    """
+        Constructs the path of the token file of the integration
+
+        Parameters:
+        index: int - The index of the google calender integration
+
+        Returns:
+        The absolute path of the token file
+    """
+
+    # Construct absolute path by using this script's location
+    script_dir = os.path.dirname(__file__)
+    return os.path.join(script_dir, f"google_token_{index}.json")
+
+
+def __list_events(service, calendar_id: str, time_zone: str,
+        window: Tuple[datetime.datetime, datetime.datetime] | None) -> List[Dict]:
+    """
+        Lists the events of a calendar in a window, with only the fields needed,
+        following the pages
+
+        Parameters:
+        service: Resource - The Calendar API service
+        calendar_id: str - The id of the calendar
+        time_zone: str - The timezone string (f.e. 'Europe/Amsterdam') of the day's boundaries
+        window: Tuple[datetime, datetime] | None - The start and end of the events listed,
+            today if it's None
+
+        Returns:
+        A list of event dictionaries
+    """
+
+    if window:
+        day_start, day_end = window
+    else:
+        day_start = datetime.datetime.now(ZoneInfo(time_zone)).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        day_end = day_start + datetime.timedelta(days=1)
 
-        # Call the Calendar API
-        now = datetime.datetime.utcnow().isoformat() + "Z"  # 'Z' indicates UTC time
+    events = []
+    page_token = None
+    while True:
         events_result = (
             service.events()
             .list(
-                calendarId="primary",
-                timeMin=now,
-                maxResults=10,
+                calendarId=calendar_id,
+                timeMin=day_start.isoformat(),
+                timeMax=day_end.isoformat(),
+                timeZone=time_zone,
+                maxResults=PAGE_SIZE,
                 singleEvents=True,
                 orderBy="startTime",
+                pageToken=page_token,
+                fields=f"nextPageToken,{EVENT_FIELDS}",
             )
             .execute()
         )
+        events.extend(events_result.get("items", []))
+
+        page_token = events_result.get("nextPageToken")
+        if not page_token:
+            return events
+
+
+def __sync_events(service, index: int, calendar_id: str) -> List[Dict]:
+    """
+        Synchronizes the locally stored events of a calendar with the Calendar API.
+        The first run does a full synchronization, later runs only fetch the changes
+        since the previous run. The sync token and the events are stored in the
+        google_sync_{index}.json file, next to the token file.
+
+        Parameters:
+        service: Resource - The Calendar API service
+        index: int - The index of the google calender integration, identifies the sync file
+        calendar_id: str - The id of the calendar to synchronize
 
-        return events_result.get("items", [])
+        Returns:
+        A list of all the stored event dictionaries of the calendar
+    """
+
+    # Read the state of the previous synchronization, an unreadable state starts over
+    script_dir = os.path.dirname(__file__)
+    abs_sync_path = os.path.join(script_dir, f"google_sync_{index}.json")
+    sync_state = {}
+    if os.path.exists(abs_sync_path):
+        try:
+            sync_state = file.read_json_file(abs_sync_path)
+        except (OSError, ValueError):
+            print(f"The sync file {abs_sync_path} is not readable, doing a full sync")
 
+    calendar_state = sync_state.get(calendar_id, {})
+    events = calendar_state.get("events", {})
+    sync_token = calendar_state.get("syncToken")
+
+    try:
+        sync_token = __apply_event_changes(service, calendar_id, events, sync_token)
     except HttpError as error:
-        print(f"An error occurred: {error}")
-        raise
+
+        # The sync token has expired, the synchronization has to start over
+        if error.resp.status != 410:
+            raise
+        events = {}
+        sync_token = __apply_event_changes(service, calendar_id, events, None)
+
+    # Drop the events which have ended before yesterday, so the store does not grow endlessly
+    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    events = {
+        event_id: event for event_id, event in events.items()
+        if event["end"].get("dateTime", event["end"].get("date", ""))[:10] >= yesterday
+    }
+
+    # Save the state for the next synchronization
+    sync_state[calendar_id] = {"syncToken": sync_token, "events": events}
+    file.write_json_file(abs_sync_path, sync_state)
+
+    return list(events.values())
+
+
+def __apply_event_changes(service, calendar_id: str, events: Dict[str, Dict],
+        sync_token: str | None) -> str:
+    """
+        Lists the events changed since the sync token (or all upcoming events, if there is
+        no sync token), and applies them to the events given
+
+        Parameters:
+        service: Resource - The Calendar API service
+        calendar_id: str - The id of the calendar
+        events: Dict[str, Dict] - The stored events by their ids, updated in place
+        sync_token: str | None - The sync token of the previous synchronization
+
+        Returns:
+        The sync token to use for the next synchronization
+    """
+
+    list_params = {
+        "calendarId": calendar_id,
+        "singleEvents": True,
+        "maxResults": PAGE_SIZE,
+        "fields": f"nextPageToken,nextSyncToken,{EVENT_FIELDS}",
+    }
+    if sync_token:
+        list_params["syncToken"] = sync_token
+    else:
+        # A full synchronization starts from yesterday, so ongoing events are included
+        yesterday = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        list_params["timeMin"] = yesterday.isoformat() + "Z"
+
+    page_token = None
+    while True:
+        events_result = service.events().list(pageToken=page_token, **list_params).execute()
+
+        for event in events_result.get("items", []):
+            if event.get("status") == "cancelled":
+                events.pop(event["id"], None)
+            else:
+                events[event["id"]] = event
+
+        # The sync token is only present on the last page
+        page_token = events_result.get("nextPageToken")
+        if not page_token:
+            return events_result.get("nextSyncToken")
@@ -0,0 +1,123 @@
+"""
+    Contains the interface every calendar integration implements
+"""
+
+import abc
+import asyncio
+import threading
+
+from typing import Callable, Dict, List
+
+from intervals import Interval
+
+
+class CalendarProvider(abc.ABC):
+    """
+    A calendar integration providing the meetings of a user. The providers are created by
+    the registry from the 'integrations' config, and are fetched concurrently.
+
+    Subclasses have to implement fetch_meetings, a blocking call which is run on a daemon
+    thread by fetch, otherwise they can't be instantiated. Providers with an asynchronous
+    client can override fetch too.
+    """
+
+    # The name of the provider, used in the logs
+    display_name = 'Calendar'
+
+    def __init__(self, integration_config: Dict[str, any], index: int | str,
+            time_zone: str, interactive: bool = False) -> None:
+        """
+        Parameters:
+        integration_config: Dict[str, any] - The integration's config
+        index: int | str - The index of the integration among the enabled integrations of
+            the same kind (prefixed with the user's name in batch mode), identifies its files
+        time_zone: str - The local timezone of the user
+        interactive: bool - If set, the user is at the terminal, and can be asked to log in
+            (f.e. via web browser). Otherwise a missing login fails the fetching.
+        """
+
+        self.integration_config = integration_config
+        self.index = index
+        self.time_zone = time_zone
+        self.interactive = interactive
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies the provider among every provider of the process
+
+        Returns:
+        The class name and the index of the provider
+        """
+
+        return f'{type(self).__name__}_{self.index}'
+
+    async def fetch(self, window: Interval) -> List[Interval]:
+        """
+        Fetches the meetings starting in a window
+
+        Parameters:
+        window: Interval - The timezone aware start (inclusive) and end (exclusive) of the window
+
+        Returns:
+        The meetings with their timezone aware start and end time, in UTC
+        """
+
+        return await run_in_daemon_thread(self.fetch_meetings, window)
+
+    @abc.abstractmethod
+    def fetch_meetings(self, window: Interval) -> List[Interval]:
+        """
+        Fetches the meetings starting in a window, blocking until they are received
+
+        Parameters:
+        window: Interval - The timezone aware start (inclusive) and end (exclusive) of the window
+
+        Returns:
+        The meetings with their timezone aware start and end time, in UTC
+        """
+
+        raise NotImplementedError
+
+
+async def run_in_daemon_thread(function: Callable, *args) -> any:
+    """
+    Runs a blocking function on a daemon thread of its own. Unlike asyncio.to_thread,
+    the thread is not joined at the exit of the interpreter, so a function that hangs
+    (f.e. on a request without a timeout) can't keep the process alive.
+    When the awaiting task is cancelled, the function keeps running, its result is dropped.
+
+    Parameters:
+    function: Callable - The blocking function
+    args: any - The arguments of the function
+
+    Returns:
+    The result of the function
+    """
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def set_outcome(result: any, error: BaseException | None) -> None:
+        if future.done():
+            return
+
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def run() -> None:
+        try:
+            outcome = (function(*args), None)
+        except BaseException as error:
+            outcome = (None, error)
+
+        try:
+            loop.call_soon_threadsafe(set_outcome, *outcome)
+        except RuntimeError:
+            # The loop has been closed since, nobody waits for the result anymore
+            pass
+
+    threading.Thread(target=run, daemon=True).start()
+    return await future
@@ -0,0 +1,166 @@
+"""
+    Contains the registry of the calendar integrations. The modules of the integrations
+    (and their SDKs) are only imported when an integration of theirs is enabled.
+"""
+
+import asyncio
+import importlib
+import threading
+
+from typing import Dict, List, Tuple
+
+from integrations.provider import CalendarProvider
+from intervals import Interval
+
+# The providers of the integrations as 'module:class', by their names in the 'integrations' config
+PROVIDERS = {
+    'google-calendar': 'integrations.google_calendar:GoogleCalendarProvider',
+    'azure-teams': 'integrations.azure_teams:AzureTeamsProvider'
+}
+
+# Imports of the integrations' modules are serialized, so they are imported only once
+__import_lock = threading.Lock()
+
+
+def register_provider(name: str, provider_path: str) -> None:
+    """
+    Registers a new kind of integration, or replaces the provider of an existing one
+
+    Parameters:
+    name: str - The name of the integration in the 'integrations' config
+    provider_path: str - The provider class as 'module:class', f.e. 'my_ics:IcsProvider'.
+        The class has to extend CalendarProvider.
+
+    Returns:
+    None
+    """
+
+    PROVIDERS[name] = provider_path
+
+
+def get_provider_class(name: str) -> type:
+    """
+    Imports the provider class of an integration on the first call, returns it later on
+
+    Parameters:
+    name: str - The name of the integration in the 'integrations' config
+
+    Returns:
+    The provider class of the integration
+
+    Raises:
+    KeyError - If there is no integration with the name given
+    """
+
+    module_path, class_name = PROVIDERS[name].split(':')
+    with __import_lock:
+        return getattr(importlib.import_module(module_path), class_name)
+
+
+def get_enabled_integrations(integrations_config: Dict[str, List[Dict[str, any]]]) \
+        -> List[Tuple[str, int, Dict[str, any]]]:
+    """
+    Lists the enabled integrations of the 'integrations' config, without importing them
+
+    Parameters:
+    integrations_config: Dict[str, List[Dict[str, any]]] - The 'integrations' config
+
+    Returns:
+    The name of the integration, its index among the enabled integrations of the same name
+    and its config, for each enabled integration. The unknown integrations are skipped.
+    """
+
+    enabled_integrations = []
+    for name in PROVIDERS:
+        index = 0
+        for integration_config in integrations_config.get(name, []):
+            if integration_config['enabled'] is True:
+                enabled_integrations.append((name, index, integration_config))
+                index += 1
+
+    return enabled_integrations
+
+
+def create_providers(integrations_config: Dict[str, List[Dict[str, any]]], time_zone: str,
+        index_prefix: str = '', interactive: bool = False) -> List[CalendarProvider]:
+    """
+    Creates the providers of the enabled integrations. Only the modules of these are imported.
+
+    Parameters:
+    integrations_config: Dict[str, List[Dict[str, any]]] - The 'integrations' config
+    time_zone: str - The local timezone of the user
+    index_prefix: str - Prefixed to the indexes of the integrations, f.e. the name of the user
+    interactive: bool - If set, the providers can ask the user to log in
+
+    Returns:
+    The providers, in the order of the registry
+    """
+
+    return [
+        get_provider_class(name)(
+            integration_config, f'{index_prefix}{index}', time_zone, interactive)
+        for name, index, integration_config in get_enabled_integrations(integrations_config)
+    ]
+
+
+def fetch_all(providers: List[CalendarProvider], window: Interval, timeout: float) \
+        -> List[List[Interval] | BaseException | None]:
+    """
+    Fetches the meetings of the providers concurrently, on an event loop of its own.
+    The blocking providers run on daemon threads (see CalendarProvider.fetch), which are
+    not waited for after the timeout, nor at the exit of the interpreter. A provider that
+    hangs can't stall the caller, but its thread lives on until its request returns.
+
+    Parameters:
+    providers: List[CalendarProvider] - The providers to fetch
+    window: Interval - The window of the meetings
+    timeout: float - The seconds to wait for the providers
+
+    Returns:
+    For each provider (in the same order): its meetings, the exception it has failed with,
+    or None if it has timed out
+    """
+
+    if not providers:
+        return []
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(__gather_providers(providers, window, timeout))
+    finally:
+        # Closing the loop does not wait for the threads of the providers which have timed out
+        loop.close()
+
+
+async def __gather_providers(providers: List[CalendarProvider], window: Interval,
+        timeout: float) -> List[List[Interval] | BaseException | None]:
+    """
+    Fetches the meetings of the providers concurrently, see fetch_all
+
+    Parameters:
+    providers: List[CalendarProvider] - The providers to fetch
+    window: Interval - The window of the meetings
+    timeout: float - The seconds to wait for the providers
+
+    Returns:
+    The result of each provider, see fetch_all
+    """
+
+    tasks = [asyncio.ensure_future(provider.fetch(window)) for provider in providers]
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+
+    # Cancel the providers which have timed out
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for task in tasks:
+        if task in pending:
+            results.append(None)
+        elif task.exception():
+            results.append(task.exception())
+        else:
+            results.append(task.result())
+
+    return results
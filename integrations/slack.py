@@ -2,42 +2,288 @@
     Contains all logic regarding to sending requests to the Slack API.
 """
 
+import random
+import threading
+import time
+
 import requests
 
-from typing import Dict
+from requests.adapters import HTTPAdapter
+from typing import Dict, Tuple
+
+SLACK_API_URL = 'https://slack.com/api/'
+
+# Requests per minute allowed by each of Slack's rate limit tiers
+TIER_RATE_LIMITS = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# The rate limit tier of the API methods used, unlisted methods are treated as tier 3
+METHOD_TIERS = {'users.profile.set': 3}
 
 
-def set_user_status(
-        token: str, status_message: str, status_emoji: str,
-        status_expiry_date: int, user_id: str) -> Dict[str, any]:
+class TokenBucket:
     """
-    Send user status setting request to the Slack API
-
-    Parameters:
-    token: str - The authorization token (without the "Bearer" tag)
-    status_message: str - The text to be set as the status
-    status_emoji: str - The emoji appearing for the status next to the profile name.
-        It is required to be valid and set in slack format (f.e. :computer:)
-    status_expiry_date: int - The POSIX timestamp of the expiration date,
-        when the status will be deleted
-    user_id - The id of the slack user for the workspace
-
-    Returns:
-    The Slack API's response in JSON format
+    Thread safe token bucket limiting the rate of requests. A request reserves a token
+    right away and gets back how long it has to wait before it can be sent.
     """
 
-    return requests.post(
-        url='https://slack.com/api/users.profile.set',
-        headers={
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        },
-        json={
+    def __init__(self, rate_per_minute: float) -> None:
+        """
+        Parameters:
+        rate_per_minute: float - The number of requests allowed per minute.
+            This is also the size of the burst allowed after an idle period.
+        """
+
+        self.rate = rate_per_minute / 60
+        self.capacity = max(rate_per_minute, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Reserves a token from the bucket
+
+        Returns:
+        The number of seconds to wait before sending the request
+        """
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            # Tokens can go negative, the later requests are queued up behind the earlier ones
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+            return max(wait, self.blocked_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Blocks the bucket, f.e. after Slack has responded with a Retry-After header
+
+        Parameters:
+        seconds: float - How long no request should be sent
+
+        Returns:
+        None
+        """
+
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class SlackClient:
+    """
+    Client for the Slack Web API. Owns a pooled, keep-alive HTTP session, so the
+    connections (and TLS handshakes) to Slack are reused between requests and workspaces.
+    Requests are throttled per token and method according to Slack's rate limit tiers,
+    and rate limited requests are retried. The client can be shared between threads.
+    """
+
+    def __init__(
+            self, pool_size: int = 10, connect_timeout: float = 3.05,
+            read_timeout: float = 10, max_retries: int = 5,
+            backoff_base: float = 1, base_url: str = SLACK_API_URL) -> None:
+        """
+        Parameters:
+        pool_size: int - The maximum number of connections kept alive to Slack.
+            Should be at least the number of requests sent in parallel.
+        connect_timeout: float - Seconds to wait for the connection to be established
+        read_timeout: float - Seconds to wait for the response after the request is sent
+        max_retries: int - How many times a rate limited request is retried
+        backoff_base: float - Seconds of the first retry's backoff, doubled on each retry
+        base_url: str - The URL the API methods' names are appended to, f.e. of a mock server
+        """
+
+        self.base_url = base_url.rstrip('/') + '/'
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+        # Token buckets by (token, method)
+        self.buckets = {}
+        self.buckets_lock = threading.Lock()
+
+        # Counters of the throttling, see get_stats
+        self.stats = {'requests': 0, 'retries': 0, 'throttled_seconds': 0.0}
+        self.stats_lock = threading.Lock()
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def close(self) -> None:
+        """
+        Closes the pooled connections
+
+        Returns:
+        None
+        """
+
+        self.session.close()
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Returns the counters of the client
+
+        Returns:
+        A copy of the counters: number of requests sent, number of retries
+        and the total seconds requests have waited because of rate limiting
+        """
+
+        with self.stats_lock:
+            return dict(self.stats)
+
+    def call(self, method: str, token: str, payload: Dict[str, any]) -> Dict[str, any]:
+        """
+        Calls a Slack Web API method. Waits for the rate limit of the token and method,
+        and retries with jittered exponential backoff if Slack responds it's rate limited.
+
+        Parameters:
+        method: str - The name of the API method (f.e. users.profile.set)
+        token: str - The authorization token (without the "Bearer" tag)
+        payload: Dict[str, any] - The JSON body of the request
+
+        Returns:
+        The Slack API's response in JSON format. If the retries are exhausted,
+        the last rate limited response.
+        """
+
+        bucket = self.__get_bucket(token, method)
+
+        attempt = 0
+        while True:
+            self.__throttle(bucket.acquire())
+
+            response = self.session.post(
+                url=self.base_url + method,
+                headers={
+                    'Authorization': f'Bearer {token}',
+                    'Content-Type': 'application/json'
+                },
+                json=payload,
+                timeout=self.timeout
+            )
+            self.__count('requests', 1)
+
+            response_json, retry_after = self.__parse_response(response)
+            if retry_after is None or attempt >= self.max_retries:
+                return response_json
+
+            # Back off: respect Retry-After, and add jitter so the workers don't retry in sync
+            backoff = random.uniform(0, self.backoff_base * 2 ** attempt)
+            bucket.pause(retry_after + backoff)
+            self.__count('retries', 1)
+            attempt += 1
+
+    def __get_bucket(self, token: str, method: str) -> TokenBucket:
+        """
+        Returns the token bucket of a token and method pair, creates it if needed
+
+        Parameters:
+        token: str - The authorization token
+        method: str - The name of the API method
+
+        Returns:
+        The token bucket
+        """
+
+        with self.buckets_lock:
+            bucket = self.buckets.get((token, method))
+            if bucket is None:
+                tier = METHOD_TIERS.get(method, 3)
+                bucket = TokenBucket(TIER_RATE_LIMITS[tier])
+                self.buckets[(token, method)] = bucket
+
+            return bucket
+
+    def __throttle(self, seconds: float) -> None:
+        """
+        Sleeps for the time the rate limiting requires
+
+        Parameters:
+        seconds: float - The time to wait
+
+        Returns:
+        None
+        """
+
+        if seconds > 0:
+            self.__count('throttled_seconds', seconds)
+            time.sleep(seconds)
+
+    def __count(self, counter: str, value: float) -> None:
+        """
+        Increases a counter of the stats
+
+        Parameters:
+        counter: str - The name of the counter
+        value: float - The value to add
+
+        Returns:
+        None
+        """
+
+        with self.stats_lock:
+            self.stats[counter] += value
+
+    @staticmethod
+    def __parse_response(response: requests.Response) -> Tuple[Dict[str, any], float | None]:
+        """
+        Parses a Slack API response and checks if it was rate limited
+
+        Parameters:
+        response: requests.Response - The response of the Slack API
+
+        Returns:
+        The response in JSON format, and the seconds to wait before retrying
+        if the request was rate limited (None otherwise)
+        """
+
+        try:
+            response_json = response.json()
+        except ValueError:
+            response_json = {'ok': False, 'error': f'HTTP {response.status_code}'}
+
+        if response.status_code != 429 and response_json.get('error') != 'ratelimited':
+            return response_json, None
+
+        if response.status_code == 429:
+            response_json.setdefault('ok', False)
+            response_json.setdefault('error', 'ratelimited')
+
+        try:
+            return response_json, float(response.headers.get('Retry-After', 0))
+        except ValueError:
+            return response_json, 0
+
+    def set_user_status(
+            self, token: str, status_message: str, status_emoji: str,
+            status_expiry_date: int, user_id: str) -> Dict[str, any]:
+        """
+        Send user status setting request to the Slack API
+
+        Parameters:
+        token: str - The authorization token (without the "Bearer" tag)
+        status_message: str - The text to be set as the status
+        status_emoji: str - The emoji appearing for the status next to the profile name.
+            It is required to be valid and set in slack format (f.e. :computer:)
+        status_expiry_date: int - The POSIX timestamp of the expiration date,
+            when the status will be deleted
+        user_id - The id of the slack user for the workspace
+
+        Returns:
+        The Slack API's response in JSON format
+        """
+
+        return self.call('users.profile.set', token, {
             'profile': {
                 'status_text': status_message,
                 'status_emoji': status_emoji,
                 'status_expiration': status_expiry_date
             },
             'user': user_id
-        }
-    ).json()
+        })
@@ -0,0 +1,257 @@
+"""
+    Contains the snapshot cache of the calendar integrations: the normalized meetings of each
+    integration and window are stored on disk, and served from there while they are fresh
+    (or while they are not too stale, refreshing them in the background).
+"""
+
+import asyncio
+import copy
+import json
+import os.path
+import threading
+import time
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import file
+
+from integrations.provider import CalendarProvider
+from intervals import Interval
+
+# The windows being refreshed in the background, by their snapshot keys
+__refreshing = set()
+
+# Serializes the reads and writes of the snapshot files between the threads
+__snapshot_lock = threading.Lock()
+
+
+class SnapshotProvider(CalendarProvider):
+    """
+    Wraps a provider with the snapshot cache:
+        - A fresh snapshot (younger than 'ttl' seconds) is served without fetching.
+        - A stale snapshot (younger than 'max_stale' seconds) is served right away,
+            and refreshed in the background for the next run.
+        - Otherwise the meetings are fetched, and the snapshot is only served
+            if the fetching has failed or timed out, however old it is.
+    """
+
+    def __init__(self, provider: CalendarProvider, ttl: float, max_stale: float,
+            timeout: float = None) -> None:
+        """
+        Parameters:
+        provider: CalendarProvider - The provider of the integration
+        ttl: float - The seconds a snapshot is fresh for
+        max_stale: float - The seconds a snapshot is served for without waiting for the refresh
+        timeout: float - The seconds to wait for the provider, None to wait without a limit
+        """
+
+        super().__init__(provider.integration_config, provider.index, provider.time_zone,
+            provider.interactive)
+        self.provider = provider
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.display_name = provider.display_name
+
+    @property
+    def key(self) -> str:
+        return self.provider.key
+
+    async def fetch(self, window: Interval) -> List[Interval]:
+        snapshot = read_snapshot(self.key, window)
+        age = time.time() - snapshot['fetchedAt'] if snapshot else None
+
+        if snapshot and age < self.ttl:
+            return snapshot['meetings']
+
+        if snapshot and age < self.max_stale:
+            refresh_in_background(self.provider, window, self.timeout)
+            return snapshot['meetings']
+
+        try:
+            meetings = await asyncio.wait_for(self.provider.fetch(window), self.timeout)
+        except Exception as error:
+            if snapshot is None:
+                raise
+
+            error_text = str(error) or type(error).__name__
+            print(f"Getting meetings from {self.display_name} has failed, " +
+                f"using the snapshot of {int(age)} seconds ago: {error_text}")
+            return snapshot['meetings']
+
+        # Only reached if the fetching has succeeded, a failed one never replaces the snapshot
+        write_snapshot(self.key, window, meetings)
+        return meetings
+
+    def fetch_meetings(self, window: Interval) -> List[Interval]:
+        return self.provider.fetch_meetings(window)
+
+
+def refresh_in_background(provider: CalendarProvider, window: Interval,
+        timeout: float = None) -> None:
+    """
+    Fetches the meetings of the window on a new thread, and stores them in the snapshot.
+    The thread is not a daemon thread, so a short run still finishes the refresh before
+    the process exits, but it only waits for the provider until the timeout.
+    Nothing is done if the window is already being refreshed.
+    The refresh never asks the user to log in.
+
+    Parameters:
+    provider: CalendarProvider - The provider of the integration
+    window: Interval - The window of the meetings
+    timeout: float - The seconds to wait for the provider, None to wait without a limit
+
+    Returns:
+    None
+    """
+
+    refresh_key = f'{provider.key}/{get_window_key(window)}'
+    with __snapshot_lock:
+        if refresh_key in __refreshing:
+            return
+        __refreshing.add(refresh_key)
+
+    # Nobody is there to log in while the refresh runs in the background
+    provider = copy.copy(provider)
+    provider.interactive = False
+
+    def refresh() -> None:
+        outcome = {}
+
+        def fetch() -> None:
+            try:
+                outcome['meetings'] = provider.fetch_meetings(window)
+            except Exception as error:
+                outcome['error'] = error
+
+        # The provider runs on a daemon thread, so one that hangs is abandoned after the timeout
+        fetch_thread = threading.Thread(target=fetch, daemon=True)
+        fetch_thread.start()
+        fetch_thread.join(timeout)
+
+        try:
+            if fetch_thread.is_alive():
+                print(f"Refreshing the meetings of {provider.display_name} has timed out " +
+                    f"after {timeout} seconds")
+            elif 'error' in outcome:
+                print(f"Refreshing the meetings of {provider.display_name} has failed: " +
+                    f"{outcome['error']}")
+            else:
+                write_snapshot(provider.key, window, outcome['meetings'])
+        except Exception as error:
+            print(f"Refreshing the meetings of {provider.display_name} has failed: {error}")
+        finally:
+            with __snapshot_lock:
+                __refreshing.discard(refresh_key)
+
+    threading.Thread(target=refresh, name=f'snapshot-{refresh_key}').start()
+
+
+def get_window_key(window: Interval) -> str:
+    """
+    Identifies a window in the snapshot files
+
+    Parameters:
+    window: Interval - The window
+
+    Returns:
+    The start and end of the window in UTC, in ISO 8601 format
+    """
+
+    return '/'.join(boundary.astimezone(timezone.utc).isoformat() for boundary in window)
+
+
+def read_snapshot(key: str, window: Interval) -> Dict[str, any] | None:
+    """
+    Reads the snapshot of an integration's window
+
+    Parameters:
+    key: str - The key of the integration's provider
+    window: Interval - The window
+
+    Returns:
+    The snapshot as a dictionary, None if there is no snapshot of the window:
+        'fetchedAt': float - The POSIX timestamp of the fetching
+        'meetings': List[Interval] - The meetings of the window
+    """
+
+    with __snapshot_lock:
+        snapshots = __read_snapshot_file(key)
+
+    snapshot = snapshots.get(get_window_key(window))
+    if snapshot is None:
+        return None
+
+    return {
+        'fetchedAt': snapshot['fetchedAt'],
+        'meetings': [
+            (datetime.fromisoformat(start), datetime.fromisoformat(end))
+            for start, end in snapshot['meetings']
+        ]
+    }
+
+
+def write_snapshot(key: str, window: Interval, meetings: List[Interval]) -> None:
+    """
+    Stores the meetings of an integration's window in its snapshot file.
+    The snapshots of the windows which have ended before yesterday are dropped.
+
+    Parameters:
+    key: str - The key of the integration's provider
+    window: Interval - The window
+    meetings: List[Interval] - The meetings of the window
+
+    Returns:
+    None
+    """
+
+    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+    with __snapshot_lock:
+        snapshots = {
+            window_key: snapshot
+            for window_key, snapshot in __read_snapshot_file(key).items()
+            if datetime.fromisoformat(window_key.split('/')[1]) >= yesterday
+        }
+        snapshots[get_window_key(window)] = {
+            'fetchedAt': time.time(),
+            'meetings': [[start.isoformat(), end.isoformat()] for start, end in meetings]
+        }
+        file.write_json_file(__get_snapshot_path(key), snapshots)
+
+
+def __read_snapshot_file(key: str) -> Dict[str, Dict[str, any]]:
+    """
+    Reads the snapshot file of an integration
+
+    Parameters:
+    key: str - The key of the integration's provider
+
+    Returns:
+    The snapshots by their window keys, empty if the file does not exist or is not readable
+    """
+
+    abs_snapshot_path = __get_snapshot_path(key)
+    if not os.path.exists(abs_snapshot_path):
+        return {}
+
+    try:
+        with open(abs_snapshot_path) as snapshot_file:
+            return json.load(snapshot_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def __get_snapshot_path(key: str) -> str:
+    """
+    Constructs the path of the snapshot file of an integration
+
+    Parameters:
+    key: str - The key of the integration's provider
+
+    Returns:
+    The absolute path of the snapshot file
+    """
+
+    script_dir = os.path.dirname(__file__)
+    return os.path.join(script_dir, f"snapshot_{key}.json")
@@ -0,0 +1,152 @@
+"""
+    Contains the sorted interval set used for the time window arithmetic
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Iterable, Iterator, List, Tuple
+
+# A time window: (start, end)
+Interval = Tuple[datetime, datetime]
+
+
+class IntervalSet:
+    """
+    A set of disjoint intervals, kept sorted in two parallel lists of starts and ends.
+    Overlapping and touching intervals are merged on insert, and every lookup is a binary
+    search. Boundaries are inclusive: an interval contains its start and end.
+    """
+
+    def __init__(self, intervals: Iterable[Interval] = ()) -> None:
+        """
+        Parameters:
+        intervals: Iterable[Interval] - The initial intervals, in any order
+        """
+
+        self.starts = []
+        self.ends = []
+
+        # Merge the sorted intervals in a single pass
+        for start, end in sorted(intervals):
+            if start >= end:
+                continue
+
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Interval]:
+        return zip(self.starts, self.ends)
+
+    def __repr__(self) -> str:
+        return f'IntervalSet({self.to_list()})'
+
+    def to_list(self) -> List[Interval]:
+        """
+        Returns the intervals as a list
+
+        Returns:
+        The intervals in time order
+        """
+
+        return list(zip(self.starts, self.ends))
+
+    def add(self, interval: Interval) -> 'IntervalSet':
+        """
+        Adds an interval, merging it with the intervals it overlaps or touches
+
+        Parameters:
+        interval: Interval - The interval to add
+
+        Returns:
+        The interval set itself
+        """
+
+        start, end = interval
+        if start >= end:
+            return self
+
+        # The intervals from first to last (exclusive) overlap or touch the new one
+        first = bisect_left(self.ends, start)
+        last = bisect_right(self.starts, end)
+
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+        return self
+
+    def subtract(self, interval: Interval) -> 'IntervalSet':
+        """
+        Removes an interval, shortening or splitting the intervals it overlaps.
+        The interval can span any number of intervals of the set.
+
+        Parameters:
+        interval: Interval - The interval to remove
+
+        Returns:
+        The interval set itself
+        """
+
+        start, end = interval
+        if start >= end:
+            return self
+
+        # The intervals from first to last (exclusive) overlap the removed one
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        if first >= last:
+            return self
+
+        # Keep the parts sticking out on the left and on the right
+        new_starts = []
+        new_ends = []
+        if self.starts[first] < start:
+            new_starts.append(self.starts[first])
+            new_ends.append(start)
+        if self.ends[last - 1] > end:
+            new_starts.append(end)
+            new_ends.append(self.ends[last - 1])
+
+        self.starts[first:last] = new_starts
+        self.ends[first:last] = new_ends
+
+        return self
+
+    def find(self, point: datetime) -> Interval | None:
+        """
+        Finds the interval containing a point
+
+        Parameters:
+        point: datetime - The point to look up
+
+        Returns:
+        The interval containing the point, None if there is no such interval
+        """
+
+        index = bisect_right(self.starts, point) - 1
+        if index >= 0 and point <= self.ends[index]:
+            return self.starts[index], self.ends[index]
+
+        return None
+
+    def contains(self, point: datetime) -> bool:
+        """
+        Checks if a point is inside one of the intervals
+
+        Parameters:
+        point: datetime - The point to check
+
+        Returns:
+        True if one of the intervals contains the point, False otherwise
+        """
+
+        return self.find(point) is not None
@@ -0,0 +1,166 @@
+"""
+    Contains the planning of the statuses of several days ahead: the meetings of a date range
+    are bucketed per day, the statuses of each day are calculated in advance, and stored in
+    a schedule which is replayed later on, without querying the integrations again.
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+from intervals import Interval
+from status_context import StatusContext, StatusResult
+
+import utils
+
+# The days of the week planned by default (ISO weekdays, Monday is 1)
+DEFAULT_WORKING_DAYS = [1, 2, 3, 4, 5]
+
+
+def get_plan_days(first_day: date, day_count: int,
+        working_days: List[int] = None) -> List[date]:
+    """
+    Lists the working days of a date range
+
+    Parameters:
+    first_day: date - The first day of the range
+    day_count: int - The number of days in the range
+    working_days: List[int] - The ISO weekdays to plan (Monday is 1), default is Monday-Friday
+
+    Returns:
+    The working days of the range
+    """
+
+    working_days = working_days or DEFAULT_WORKING_DAYS
+    return [
+        first_day + timedelta(days=offset) for offset in range(day_count)
+        if (first_day + timedelta(days=offset)).isoweekday() in working_days
+    ]
+
+
+def bucket_meetings_by_day(meetings: List[Interval], time_zone: str) \
+        -> Dict[date, List[Interval]]:
+    """
+    Buckets the meetings by the local day of their start, in a single pass
+
+    Parameters:
+    meetings: List[Interval] - The meetings
+    time_zone: str - The local timezone string (f.e. 'Europe/Amsterdam')
+
+    Returns:
+    The meetings of each day, sorted by their start
+    """
+
+    local_tz = utils.get_local_zone(time_zone)
+
+    meetings_by_day = {}
+    for meeting in sorted(meetings):
+        meetings_by_day.setdefault(meeting[0].astimezone(local_tz).date(), []).append(meeting)
+
+    return meetings_by_day
+
+
+def plan_day(context: StatusContext, day: date, meetings: List[Interval]) -> Dict[str, any]:
+    """
+    Calculates the statuses of a day: the status of the whole day, and the status of each
+    transition of its timeline (see timeline.build_timeline)
+
+    Parameters:
+    context: StatusContext - The context of the user
+    day: date - The day
+    meetings: List[Interval] - The meetings of the integrations on the day
+
+    Returns:
+    The schedule of the day as a dictionary:
+        'status': StatusResult - The status listing the whole day
+        'transitions': List[Tuple[datetime, StatusResult]] - The statuses of the states
+            of the day, by the time they start
+
+    Raises:
+    ValueError - If the working hours are not configured properly
+    """
+
+    vacation_until = context.get_vacation_until(day)
+    if vacation_until:
+        status = context.get_vacation_status(vacation_until)
+        day_start = utils.get_day_bounds(context.time_zone, day)[0]
+        return {'status': status, 'transitions': [(day_start, status)]}
+
+    if 'statusMessage' in context.config:
+        status = StatusResult(context.config['statusMessage'], context.status_emoji,
+            int(context.get_day_end(day).timestamp()))
+        day_start = utils.get_day_bounds(context.time_zone, day)[0]
+        return {'status': status, 'transitions': [(day_start, status)]}
+
+    if 'workingHours' not in context.config:
+        raise ValueError("Neither 'vacation', 'statusMessage' nor 'workingHours' is configured")
+
+    plan = context.get_config_plan(meetings, day)
+    message = context.create_plan_status_message(plan, meetings)
+    status = StatusResult(
+        message, context.status_emoji, int(context.get_day_end(day).timestamp()))
+
+    transitions = [
+        (transition[0], context.get_transition_status(transition, message))
+        for transition in context.get_plan_timeline(plan, meetings)
+    ]
+
+    return {'status': status, 'transitions': transitions}
+
+
+def to_schedule_json(days: Dict[date, Dict[str, any]]) -> Dict[str, any]:
+    """
+    Converts the planned days into the format of the schedule file
+
+    Parameters:
+    days: Dict[date, Dict[str, any]] - The schedule of each day, see plan_day
+
+    Returns:
+    The schedule as a JSON serializable dictionary
+    """
+
+    return {
+        'generatedAt': datetime.now().astimezone().isoformat(timespec='seconds'),
+        'days': {
+            day.isoformat(): {
+                'status': list(day_schedule['status']),
+                'transitions': [
+                    [start.isoformat(), *transition_status]
+                    for start, transition_status in day_schedule['transitions']
+                ]
+            }
+            for day, day_schedule in sorted(days.items())
+        }
+    }
+
+
+def get_scheduled_status(schedule: Dict[str, any], now: datetime, use_timeline: bool) \
+        -> Tuple[StatusResult | None, datetime | None]:
+    """
+    Looks up the status to be set at a time in a schedule file's content
+
+    Parameters:
+    schedule: Dict[str, any] - The content of the schedule file, see to_schedule_json
+    now: datetime - The timezone aware local time
+    use_timeline: bool - If set, the status of the current state is returned,
+        otherwise the status of the whole day
+
+    Returns:
+    The status (None if the day is not in the schedule), and the time of the next
+    transition of the day (None if there are no more)
+    """
+
+    day_schedule = schedule.get('days', {}).get(now.date().isoformat())
+    if day_schedule is None:
+        return None, None
+
+    if not use_timeline:
+        return StatusResult(*day_schedule['status']), None
+
+    starts = [datetime.fromisoformat(transition[0]) for transition in day_schedule['transitions']]
+    index = bisect_right(starts, now) - 1
+    next_time = starts[index + 1] if index + 1 < len(starts) else None
+    if index < 0:
+        return None, next_time
+
+    return StatusResult(*day_schedule['transitions'][index][1:]), next_time
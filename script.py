@@ -2,119 +2,99 @@
     Contains the main runnable file that sets the slack status.
 """
 
-from datetime import datetime, timedelta
-from typing import List, Tuple
+import argparse
+import sys
+import time
 
-from integrations import azure_teams, google_calendar, slack
+from bisect import insort
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+from integrations import registry, slack, snapshot
+from intervals import IntervalSet
+from status_context import CREDENTIAL_SETTINGS, StatusContext, StatusResult
 
 import file
+import planner
+import timeline
 import utils
 
 
-# Global variables
-config = None
-silent_output = None
-status_expiry_date = None
-status_emoji = None
-meeting_status_emoji = None
-
-
-def set_configuration() -> None:
+def create_context(config: Dict[str, any]) -> StatusContext:
     """
-    Initialize config and status related variables
+    Creates the status context of the configuration, with the clients shared by
+    every status set by the process
+
+    Parameters:
+    config: Dict[str, any] - The configuration
 
     Returns:
-    None
+    The status context
     """
-    global silent_output
-    global status_expiry_date
-    global status_emoji
-    global meeting_status_emoji
 
-    silent_output = config.get('silentOutput', True)
-    status_expiry_date = int(
-        datetime.now().replace(hour=23, minute=59, second=59).timestamp())  # Until tonight
-    status_emoji = config.get('statusEmoji', ':speech_balloon:')
-    meeting_status_emoji = config.get('meetingStatusEmoji', ':calendar:')
+    # One pooled client is shared by every Slack request of the process
+    slack_http_config = config.get('slackHttp', {})
+    slack_client = slack.SlackClient(
+        pool_size=slack_http_config.get('poolSize', config.get('slackMaxConcurrency', 10)),
+        connect_timeout=slack_http_config.get('connectTimeout', 3.05),
+        read_timeout=slack_http_config.get('readTimeout', 10),
+        max_retries=slack_http_config.get('maxRetries', 5),
+        backoff_base=slack_http_config.get('backoffBase', 1),
+        base_url=slack_http_config.get('baseUrl', slack.SLACK_API_URL)
+    )
 
+    return StatusContext(config, slack_client)
 
-def create_status_message(time_windows: List[Tuple[datetime, datetime]],
-        meetings: List[Tuple[datetime, datetime]]) -> str:
+
+def get_half_manual_input(context: StatusContext) -> str:
     """
-    Creates the slack status message from the inputs gathered
+    From fix time formatted user inputs, creates a slack status.
+    Asks for boundaries, breaks and meetings.
 
     Parameters:
-    time_windows: List[Tuple[datetime, datetime]] - The available time windows
-        with breaks creating gaps
-    meetings: List[Tuple[datetime, datetime]] - Additional time windows
-        representing meetings
+    context: StatusContext - The context of the user
 
     Returns:
-    A string containing the final status message
+    The formatted status (f.e. 08:00 - 09:00, 10:00 -16:00)
     """
 
-    status_message = ""
-
-    # Add comma separated time windows' hours
-    index = 0
-    for time_window in time_windows:
-        status_message += \
-            f"{time_window[0].strftime('%H:%M')} - {time_window[1].strftime('%H:%M')}"
-
-        if index < len(time_windows) - 1:
-            status_message += ', '
+    plan = get_half_manual_plan(context)
+    return context.create_plan_status_message(plan, plan['integration_meetings'])
 
-        index += 1
 
-    # Add meetings if they are apparent
-    if meetings:
-        status_message += f' ({meeting_status_emoji} '
-
-        index = 0
-        for meeting in meetings:
-            status_message += f"{meeting[0].strftime('%H:%M')} - {meeting[1].strftime('%H:%M')}"
-            if index < len(meetings) - 1:
-                status_message += ', '
-
-            index += 1
-
-        status_message += ')'
-
-    return status_message
-
-
-def get_half_manual_input() -> str:
+def get_half_manual_plan(context: StatusContext) -> Dict[str, any]:
     """
-    From fix time formatted user inputs, creates a slack status.
-    Asks for boundaries, breaks and meetings.
+    From fix time formatted user inputs, creates the plan of the day
+    the slack status is calculated from. Asks for boundaries, breaks and meetings.
+
+    Parameters:
+    context: StatusContext - The context of the user
 
     Returns:
-    The formatted status (f.e. 08:00 - 09:00, 10:00 -16:00)
+    The plan as a dictionary:
+        'working_window': Tuple[datetime, datetime] - The start and end of the day
+        'breaks': List[Tuple[datetime, datetime]] - The breaks
+        'manual_meetings': List[Tuple[datetime, datetime]] - The meetings added by hand
+        'use_integrations': bool - If the meetings of the integrations are part of the status
+        'integration_meetings': List[Tuple[datetime, datetime]] - The meetings
+            loaded from the integrations while the plan was created
     """
 
     # We need to keep track of available time windows we can insert breaks or meetings into
-    available_windows = []
+    available_windows = IntervalSet()
 
     # We also keep track of the windows outside of meetings
     # this will be present in the slack status before the meetings' listing
-    time_windows = []
+    time_windows = IntervalSet()
 
     # Get start and end time - ask if we want to get it automatically
     if utils.get_boolean_input("Would you like to add start and end time automatically? " +
             "(starts from next 15 minutes, ends in + 8:30 hours)"):
 
         # Round to next 15 minutes
-        now = datetime.now()
-        if now.minute >= 0 and now.minute <= 15:
-            start_time = now.replace(minute=15)
-        elif now.minute > 15 and now.minute <= 30:
-            start_time = now.replace(minute=30)
-        elif now.minute > 30 and now.minute <= 45:
-            start_time = now.replace(minute=45)
-        elif now.minute > 45:
-            start_time = now.replace(minute=0) + timedelta(hours=1)
-        else:
-            raise Exception(f"Unknown case for minute: {now.minute}")
+        start_time = context.get_auto_start()
 
         # End time: start + 8 and a half hours
         end_time = start_time + timedelta(hours=8, minutes=30)
@@ -123,44 +103,56 @@ def get_half_manual_input() -> str:
         # Get start time as python datetime
         start_time = utils.get_hour_input(
             'Set the starting time of the status',
-            available_windows
+            available_windows,
+            time_zone=context.time_zone
         )
 
         # Get end time as python datetime
         end_time = utils.get_hour_input(
             'Set the ending time of the status',
             available_windows,
-            after_than=start_time
+            after_than=start_time,
+            time_zone=context.time_zone
         )
 
     # Add the set limits as tuple of the only available and time window
-    available_windows.append((start_time, end_time))
-    time_windows.append((start_time, end_time))
+    available_windows.add((start_time, end_time))
+    time_windows.add((start_time, end_time))
 
     # Print current status
     meetings = []
-    status_message = create_status_message(time_windows, meetings)
+    status_message = context.create_status_message(time_windows, meetings)
+
+    # Keep track of the inputs of the plan
+    plan = {
+        'working_window': (start_time, end_time),
+        'breaks': [],
+        'manual_meetings': [],
+        'use_integrations': False,
+        'integration_meetings': []
+    }
 
     # Get meetings - ask if we want to load it from integration first
     prompt = "Would you like to add meetings from integrations first? "
     prompt += f"Current status is: {status_message}."
     if utils.get_boolean_input(prompt):
-        integration_meetings = get_meetings_from_integrations()
+        integration_meetings = get_meetings_from_integrations(context, interactive=True)
+        plan['use_integrations'] = True
+        plan['integration_meetings'] = integration_meetings
         for int_meeting in integration_meetings:
 
-            # Add the new meeting to the list and the re-sort
-            meetings.append(int_meeting)
-            meetings.sort(key=lambda x: x[0])
+            # Add the new meeting to the sorted list
+            insort(meetings, int_meeting)
 
             # Alter available windows (but not time windows) based on the new meeting
-            available_windows = utils.add_new_window(int_meeting, available_windows)
+            available_windows.subtract(int_meeting)
 
             # Calculate status message with each iteration
             # so we can prompt to the user how it's changing
-            status_message = create_status_message(time_windows, meetings)
+            status_message = context.create_status_message(time_windows, meetings)
 
     # Get meetings - we ask for each if the user wants to add yet another
-    status_message = create_status_message(time_windows, meetings)
+    status_message = context.create_status_message(time_windows, meetings)
     while True:
         prompt_part = "a" if len(meetings) == 0 else "another"
         prompt = f"Would you like to add {prompt_part} meeting? "
@@ -171,26 +163,28 @@ def get_half_manual_input() -> str:
 
         meeting_start = utils.get_hour_input(
             'Set the starting time of the meeting',
-            available_windows
+            available_windows,
+            time_zone=context.time_zone
         )
 
         meeting_end = utils.get_hour_input(
             'Set the ending time of the meeting',
             available_windows,
-            after_than=meeting_start
+            after_than=meeting_start,
+            time_zone=context.time_zone
         )
 
-        # Add the new meeting to the list and the re-sort
+        # Add the new meeting to the sorted list
         new_meeting = (meeting_start, meeting_end)
-        meetings.append(new_meeting)
-        meetings.sort(key=lambda x: x[0])
+        insort(meetings, new_meeting)
+        plan['manual_meetings'].append(new_meeting)
 
         # Alter available windows (but not time windows) based on the new meeting
-        available_windows = utils.add_new_window(new_meeting, available_windows)
+        available_windows.subtract(new_meeting)
 
         # Calculate status message with each iteration
         # so we can prompt to the user how it's changing
-        status_message = create_status_message(time_windows, meetings)
+        status_message = context.create_status_message(time_windows, meetings)
 
     # Get breaks - we ask for each if the user wants to add yet another
     first_break = True
@@ -204,198 +198,792 @@ def get_half_manual_input() -> str:
 
         break_start = utils.get_hour_input(
             'Set the starting time of the break',
-            available_windows
+            available_windows,
+            time_zone=context.time_zone
         )
 
         break_end = utils.get_hour_input(
             'Set the ending time of the break',
             available_windows,
-            after_than=break_start
+            after_than=break_start,
+            time_zone=context.time_zone
         )
 
         # Add the new meeting to the list
         new_break = (break_start, break_end)
+        plan['breaks'].append(new_break)
 
         # Alter available windows and time windows too, based on the new break
-        available_windows = utils.add_new_window(new_break, available_windows)
-        time_windows = utils.add_new_window(new_break, time_windows)
+        available_windows.subtract(new_break)
+        time_windows.subtract(new_break)
         if first_break:
             first_break = False
 
         # Calculate status message with each iteration
         # so we can prompt to the user how it's changing
-        status_message = create_status_message(time_windows, meetings)
+        status_message = context.create_status_message(time_windows, meetings)
 
-    return status_message
+    return plan
 
 
-def get_meetings_from_integrations() -> List[Tuple[datetime, datetime]]:
+def get_meetings_from_integrations(context: StatusContext,
+        window: Tuple[datetime, datetime] = None, sources: List[str] = None,
+        interactive: bool = False) -> List[Tuple[datetime, datetime]]:
     """
-        Uses integrations to get the meetings in a list
+        Uses integrations to get the meetings in a list. The integrations are queried
+        concurrently, each of them has 'integrationTimeout' seconds to respond.
+        The meetings are served from the snapshot cache if it is enabled ('snapshotCache').
+
+        Parameters:
+        context: StatusContext - The context of the user. If the user has a name,
+            the token files of the integrations are prefixed with it.
+        window: Tuple[datetime, datetime] - The window of the meetings, default is today
+        sources: List[str] - The names of the integrations to use (f.e. ['google-calendar']),
+            default is all of them
+        interactive: bool - If set, the user is at the terminal, and the integrations can ask
+            them to log in. Otherwise an integration which needs a login fails.
 
         Returns:
         The list of the time windows as the meetings, f.e. [(08:00 - 09:00), (10:00, 10:30)]
         Overlapping is not checked or handled.
     """
 
+    index_prefix = f'{utils.get_file_name(str(context.name))}_' if context.name else ''
+    window = window or utils.get_day_bounds(context.time_zone)
+
+    # Only the modules of the enabled integrations are imported
+    integrations_config = {
+        name: integration_configs
+        for name, integration_configs in context.config['integrations'].items()
+        if sources is None or name in sources
+    }
+    providers = registry.create_providers(
+        integrations_config, context.time_zone, index_prefix, interactive)
+    if not providers:
+        return []
+
+    # Serve the meetings from the snapshots of the previous runs while they are fresh enough,
+    # and fall back to them if an integration fails
+    timeout = context.config.get('integrationTimeout', 120)
+    snapshot_config = context.config.get('snapshotCache', {})
+    if snapshot_config.get('enabled', True):
+        providers = [
+            snapshot.SnapshotProvider(provider, snapshot_config.get('ttl', 300),
+                snapshot_config.get('maxStale', 3600), timeout)
+            for provider in providers
+        ]
+
+        # The providers time out on their own, so they can fall back to the snapshots
+        timeout += 1
+
+    # Fetch from all integrations at the same time
+    print(f"Getting meetings from {len(providers)} integration(s)...")
+    results = registry.fetch_all(providers, window, timeout)
+
+    # Merge the results of the integrations which have finished
     meeting_list = []
+    provider_counts = {}
+    for provider, result in zip(providers, results):
+        provider_counts[provider.display_name] = provider_counts.get(provider.display_name, 0) + 1
+        name = f"{provider_counts[provider.display_name]}. {provider.display_name}"
+
+        if result is None:
+            print(f"Getting meetings from {name} has timed out, skipping it")
+        elif isinstance(result, BaseException):
+            print(f"Getting meetings from {name} has failed, skipping it: {result}")
+        else:
+            meeting_list.extend(result)
+            print(f"Getting meetings from {name}: Done!")
 
-    # Google calendar meetings - if it is present among the integrations
-    if 'google-calendar' in config['integrations']:
+    # Remove duplicates from list
+    meeting_list = list(dict.fromkeys(meeting_list))
 
-        # Go through each integration
-        index = 0
-        for google_calendar_integration in config['integrations']['google-calendar']:
+    return meeting_list
 
-            # Only load it if it is enabled
-            if google_calendar_integration['enabled'] is True:
 
-                print(f"Getting meetings from {index+1}. Google Calendar API...")
+def set_slack_status(context: StatusContext, status: StatusResult,
+        report: bool = True) -> List[Dict[str, any]]:
+    """
+    Sets the given status to all workspaces of the user.
+    The requests are sent concurrently, limited by the 'slackMaxConcurrency' config.
+    Workspaces which already have the same status set (based on the status file) are skipped.
 
-                # Get meetings
-                google_meetings = google_calendar.get_meetings(
-                    google_calendar_integration['credentials'],
-                    index
-                )
+    Parameters:
+    context: StatusContext - The context of the user
+    status: StatusResult - The status to be set
+    report: bool - If set, the result of each workspace is printed
 
-                # Parse meetings
-                meeting_list.extend(utils.parse_google_meetings(google_meetings))
+    Returns:
+    The result of each workspace in the order of the config: the Slack API's response,
+    or {'ok': True, 'skipped': True} if the status was unchanged
+    """
 
-                index += 1
-                print("Done!")
+    user_config = context.config
+    workspace_count = len(user_config['slackApiTokens'])
+    if workspace_count == 0:
+        return []
+
+    # Skip the workspaces where the very same status was already set by a previous run
+    status_cache = file.read_status_file()
+    status_digest = utils.get_status_digest(*status)
+    workspace_keys = [
+        utils.get_workspace_key(user_config['slackApiTokens'][token_number],
+            user_config['slackUserIds'][token_number])
+        for token_number in range(workspace_count)
+    ]
+    pending_token_numbers = [
+        token_number for token_number in range(workspace_count)
+        if not user_config.get('skipUnchangedStatus', True) or
+        status_cache.get(workspace_keys[token_number], {}).get('digest') != status_digest
+    ]
+
+    # Send the requests to every workspace in parallel, at most 'slackMaxConcurrency' at a time
+    slack_responses = {}
+    if pending_token_numbers:
+        max_workers = min(max(user_config.get('slackMaxConcurrency', 10), 1),
+            len(pending_token_numbers))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            slack_responses = dict(zip(pending_token_numbers, executor.map(
+                lambda token_number: __set_workspace_status(context, token_number, status),
+                pending_token_numbers
+            )))
+
+    # Report the results in the order of the workspaces in the config
+    results = []
+    updated_entries = {}
+    for token_number in range(workspace_count):
+        if report:
+            print(f"Configuring the {token_number + 1}. workspace...")
+
+        if token_number not in slack_responses:
+            results.append({'ok': True, 'skipped': True})
+            if report:
+                print('Status is unchanged, skipped')
+            continue
+
+        slack_response = slack_responses[token_number]
+        results.append(slack_response)
 
-    # Azure teams meetings - if it is present among the integrations
-    if 'azure-teams' in config['integrations']:
+        # Log if it's not silenced
+        if report and not context.silent_output:
+            print('Slack response:')
+            print(slack_response)
 
-        # Go through each integration
-        index = 0
-        for azure_teams_integration in config['integrations']['azure-teams']:
+        # Handle response
+        slack_response_status = slack_response.get('ok', False)
+        if slack_response_status is False:
+            slack_response_error = slack_response.get('error',
+                'Error not present in slack response!')
+            if report:
+                print(f'Error on setting slack status: {slack_response_error}')
+        else:
+            updated_entries[workspace_keys[token_number]] = {
+                'digest': status_digest,
+                'statusMessage': status.message,
+                'updatedAt': datetime.now().isoformat(timespec='seconds')
+            }
+            if report:
+                print('Done')
 
-            # Only load it if it is enabled
-            if azure_teams_integration['enabled'] is True:
+    # Remember what was set, so the next run can skip it
+    if updated_entries:
+        file.update_status_file(updated_entries)
 
-                print(f"Getting meetings from {index+1}. Azure Teams API...")
+    # Log the rate limiting counters if it's not silenced
+    if report and not context.silent_output:
+        slack_stats = context.slack_client.get_stats()
+        print(f"Slack requests: {slack_stats['requests']}, retries: {slack_stats['retries']}, " +
+            f"throttled: {slack_stats['throttled_seconds']:.2f}s")
 
-                # Get meetings
-                teams_meetings = azure_teams.get_meetings(
-                    azure_teams_integration['credentials']
-                )
+    return results
 
-                # Parse meetings
-                meeting_list.extend(utils.parse_teams_meetings(
-                    teams_meetings,
-                    config['localTimeZone']
-                ))
 
-                index += 1
-                print("Done!")
+def __set_workspace_status(context: StatusContext, token_number: int,
+        status: StatusResult) -> Dict[str, any]:
+    """
+    Sets the status for a single workspace. Runs on a worker thread of set_slack_status.
 
-    # Remove duplicates from list
-    meeting_list = list(dict.fromkeys(meeting_list))
+    Parameters:
+    context: StatusContext - The context of the user
+    token_number: int - The index of the workspace's token and user id in the config
+    status: StatusResult - The status to be set
 
-    return meeting_list
+    Returns:
+    The Slack API's response, or an error response if the request could not be sent
+    """
+
+    try:
+        return context.slack_client.set_user_status(
+            token=context.config["slackApiTokens"][token_number],
+            status_message=status.message,
+            status_emoji=status.emoji,
+            status_expiry_date=status.expiry_date,
+            user_id=context.config['slackUserIds'][token_number]
+        )
+
+    # A failing workspace should not stop the others from being configured
+    except Exception as error:
+        return {'ok': False, 'error': f'Request failed: {error}'}
+
+
+def run_once(context: StatusContext, interactive: bool = True) -> None:
+    """
+    Asks for the inputs of the status, and sets it to all workspaces once
+
+    Parameters:
+    context: StatusContext - The context of the user
+    interactive: bool - If not set, nothing is asked, the status is calculated from
+        the configuration (see get_config_status)
+
+    Returns:
+    None
+    """
+
+    # Check if vacation is supposed to be set based on the configuration
+    vacation_until = context.get_vacation_until()
+    if not interactive:
+        try:
+            status = get_user_status(context)
+        except ValueError as error:
+            print(f"The status can't be calculated from the configuration: {error}")
+            sys.exit(1)
+    elif vacation_until:
+        print(f"Vacation set in config until {context.config['vacation']['untilDate']}")
+        status = context.get_vacation_status(vacation_until)
+
+    # Check if the user wants to set the status fully manually (free text)
+    # or half manually (setting boundaries, meetings with fix time formats)
+    elif utils.get_boolean_input("Do you want to set the status partially automatically?"):
+        status = context.create_status(get_half_manual_input(context))
+    else:
+        status = context.create_status(
+            utils.get_text_input("Add the fix status message you want to set:"))
+
+    print('')
+    print("The final status message will be:")
+    print(status.message)
+    print('')
+
+    # Set the final status to all workspaces
+    set_slack_status(context, status)
+
+
+def run_daemon(context: StatusContext, interval: int, use_timeline: bool = False,
+        interactive: bool = True) -> None:
+    """
+    Keeps running and keeps the status up to date. The configuration, the clients and
+    the tokens stay loaded between the updates. The inputs of the status are asked once a day,
+    then the meetings of the integrations are reloaded and the status is recalculated and
+    pushed every 'interval' seconds and at the boundaries of the day's meetings and breaks.
+    Unchanged statuses are not sent again (see 'skipUnchangedStatus').
+
+    Parameters:
+    context: StatusContext - The context of the user
+    interval: int - The seconds between two updates
+    use_timeline: bool - If set, the status follows the state of the user (in a meeting,
+        on a break, available, done for the day): it is updated exactly at the transitions,
+        and expires at the next one
+    interactive: bool - If not set, nothing is asked, the status of each day is calculated
+        from the configuration (see get_config_status), which needs an explicit start of
+        the working hours
+
+    Returns:
+    None
+    """
+
+    # The plan of each day is calculated at midnight without asking, an 'auto' start
+    # would start the working hours right then
+    working_hours = context.config.get('workingHours')
+    if not interactive and working_hours is not None and \
+            'statusMessage' not in context.config and working_hours.get('start', 'auto') == 'auto':
+        print("The daemon needs an explicit 'start' of the working hours (not 'auto') " +
+            "in the non-interactive mode")
+        sys.exit(1)
+
+    current_day = None
+    plan = None
+    status = None
+    scheduler = timeline.TransitionScheduler()
+
+    try:
+        while True:
+
+            # Ask for the inputs of the day on the first update of every day
+            fresh_plan = False
+            if context.now().date() != current_day:
+                current_day = context.now().date()
+
+                plan = None
+                vacation_until = context.get_vacation_until()
+                if not interactive:
+                    try:
+                        plan, status = get_config_status(context)
+                    except ValueError as error:
+                        print(f"The status can't be calculated from the configuration: {error}")
+                        sys.exit(1)
+                    fresh_plan = plan is not None
+                elif vacation_until:
+                    print("Vacation set in config until " +
+                        f"{context.config['vacation']['untilDate']}")
+                    status = context.get_vacation_status(vacation_until)
+                elif utils.get_boolean_input(
+                        "Do you want to set the status partially automatically?"):
+                    plan = get_half_manual_plan(context)
+                    fresh_plan = True
+                else:
+                    status = context.create_status(utils.get_text_input(
+                        "Add the fix status message you want to set:"))
+
+            # Recalculate the status with the current meetings of the integrations
+            integration_meetings = []
+            if plan:
+                if fresh_plan:
+                    integration_meetings = plan['integration_meetings']
+                elif plan['use_integrations']:
+
+                    # The meeting sources of the configuration only apply to its plans,
+                    # the interactive plans use every integration
+                    sources = None
+                    if not interactive:
+                        sources = context.config.get('workingHours', {}).get('meetingSources')
+                    integration_meetings = get_meetings_from_integrations(context, sources=sources)
+                status = context.create_status(
+                    context.create_plan_status_message(plan, integration_meetings))
+
+            if plan and use_timeline:
+
+                # Reschedule the transitions with the current meetings, and set the current one
+                scheduler.schedule(context.get_plan_timeline(plan, integration_meetings))
+                transition = scheduler.pop_due(context.now())
+                if transition:
+                    transition_status = context.get_transition_status(transition, status.message)
+                    print(f"[{context.now().strftime('%H:%M:%S')}] Status: " +
+                        f"{transition_status.emoji} {transition_status.message}")
+                    set_slack_status(context, transition_status)
+
+                wake_time = get_next_wake_time(context, None, [], interval)
+                if scheduler.next_time():
+                    wake_time = min(wake_time, scheduler.next_time())
+
+            else:
+                print(f"[{context.now().strftime('%H:%M:%S')}] Status: {status.message}")
+                set_slack_status(context, status)
+
+                wake_time = get_next_wake_time(context, plan, integration_meetings, interval)
+
+            # Sleep until the next tick, boundary or the next day
+            time.sleep(max((wake_time - context.now()).total_seconds(), 0))
+
+    except KeyboardInterrupt:
+        print('Daemon stopped')
+
+
+def get_next_wake_time(context: StatusContext, plan: Dict[str, any] | None,
+        integration_meetings: List[Tuple[datetime, datetime]], interval: int) -> datetime:
+    """
+    Calculates when the daemon should update the status next
+
+    Parameters:
+    context: StatusContext - The context of the user
+    plan: Dict[str, any] | None - The plan of the day, see get_half_manual_plan
+    integration_meetings: List[Tuple[datetime, datetime]] - The meetings of the integrations
+    interval: int - The seconds between two periodic updates
+
+    Returns:
+    The earliest of: the next periodic update, the next start or end of the working window,
+    a break or a meeting, and the start of the next day
+    """
+
+    now = context.now()
+    candidates = [
+        now + timedelta(seconds=interval),
+        now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    ]
+
+    if plan:
+        windows = [plan['working_window'], *plan['breaks'], *plan['manual_meetings']]
+        if plan['use_integrations']:
+            windows.extend(integration_meetings)
+
+        candidates.extend(
+            boundary for window in windows for boundary in window if boundary > now)
+
+    return min(candidates)
+
+
+def get_config_plan(context: StatusContext, day: date = None) -> Dict[str, any]:
+    """
+    Creates the plan of a day from the 'workingHours' configuration without any input,
+    with the meetings of the integrations listed in 'meetingSources' (default is all of them)
+
+    Parameters:
+    context: StatusContext - The context of the user
+    day: date - The day of the plan, default is today
+
+    Returns:
+    The plan as a dictionary, see get_half_manual_plan
+
+    Raises:
+    ValueError - If the working hours are not configured properly
+    """
+
+    working_hours = context.config['workingHours']
+    integration_meetings = []
+    if working_hours.get('useIntegrations', True):
+        window = utils.get_day_bounds(context.time_zone, day)
+        integration_meetings = get_meetings_from_integrations(
+            context, window, working_hours.get('meetingSources'))
+
+    return context.get_config_plan(integration_meetings, day)
+
+
+def get_config_status(context: StatusContext) -> Tuple[Dict[str, any] | None, StatusResult | None]:
+    """
+    Determines the status of a user from the configuration, without any input: the vacation
+    if it is set, otherwise the fix 'statusMessage', or the plan of the 'workingHours'
+
+    Parameters:
+    context: StatusContext - The context of the user
+
+    Returns:
+    The plan of the day and None if the status is calculated from the working hours,
+    None and the status otherwise
+
+    Raises:
+    ValueError - If the user has nothing configured to calculate the status from
+    """
+
+    vacation_until = context.get_vacation_until()
+    if vacation_until:
+        return None, context.get_vacation_status(vacation_until)
+
+    if 'statusMessage' in context.config:
+        return None, context.create_status(context.config['statusMessage'])
+
+    if 'workingHours' in context.config:
+        return get_config_plan(context), None
+
+    raise ValueError("Neither 'vacation', 'statusMessage' nor 'workingHours' is configured")
+
+
+def get_user_status(context: StatusContext) -> StatusResult:
+    """
+    Calculates the status of a user without any input, see get_config_status
+
+    Parameters:
+    context: StatusContext - The context of the user
+
+    Returns:
+    The status of the user
+
+    Raises:
+    ValueError - If the user has nothing configured to calculate the status from
+    """
+
+    plan, status = get_config_status(context)
+    if plan:
+        status = context.create_status(
+            context.create_plan_status_message(plan, plan['integration_meetings']))
+
+    return status
+
+
+def run_batch(context: StatusContext, roster_path: str) -> None:
+    """
+    Sets the status of every user of a roster file in a single process. The users are
+    processed concurrently by a pool of 'workers' threads, sharing the Slack client and
+    its connection pools. The settings missing from a user are taken from the config,
+    except for the credentials: a user without their own fails.
+
+    Parameters:
+    context: StatusContext - The context of the configuration, the base of the users' contexts
+    roster_path: str - The path of the roster file
+
+    Returns:
+    None
+    """
+
+    roster = file.read_roster_file(roster_path)
+    users = roster['users']
+    if len(users) == 0:
+        print('The roster has no users')
+        return
+
+    user_contexts = [
+        context.for_user({'name': str(index + 1), **user}, inherit_credentials=False)
+        for index, user in enumerate(users)
+    ]
+
+    # The users with the same name would share their token and snapshot files
+    name_counts = Counter(user_context.name for user_context in user_contexts)
+    duplicate_names = sorted(name for name, count in name_counts.items() if count > 1)
+    if duplicate_names:
+        print(f"The roster has duplicate user names: {', '.join(duplicate_names)}")
+        return
+
+    started_at = time.monotonic()
+    max_workers = min(max(roster.get('workers', 8), 1), len(user_contexts))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = list(executor.map(__run_user, user_contexts))
+
+    # Report the outcome of each user in the order of the roster
+    failed_count = 0
+    for user_context, (status, error) in zip(user_contexts, outcomes):
+        if error:
+            failed_count += 1
+            print(f"{user_context.name}: FAILED - {error}")
+        else:
+            print(f"{user_context.name}: {status.message}")
+
+    print(f"{len(user_contexts) - failed_count}/{len(user_contexts)} users updated " +
+        f"in {time.monotonic() - started_at:.2f}s")
 
 
-def get_vacation_status(until_date: datetime) -> str:
+def __run_user(context: StatusContext) -> Tuple[StatusResult | None, str | None]:
     """
-    Produces a status message and sets certain configurations for the vacation status.
+    Calculates and sets the status of a single user. Runs on a worker thread of run_batch.
 
     Parameters:
-    until_date: datetime - The date until the vacation lasts.
+    context: StatusContext - The context of the user
 
     Returns:
-    The status message to be set
+    The status set and None, or None and the error if the user has failed
     """
 
-    global status_expiry_date
-    global status_emoji
+    missing_settings = [name for name in CREDENTIAL_SETTINGS if name not in context.config]
+    if missing_settings:
+        return None, f"Missing {', '.join(missing_settings)}"
 
-    status_expiry_date = int(
-        until_date.replace(hour=23, minute=59, second=59).timestamp())  # Until last day of vacation
-    status_emoji = config['vacation'].get('statusEmoji', ':palm_tree:')
+    try:
+        status = get_user_status(context)
+        results = set_slack_status(context, status, report=False)
+    except Exception as error:
+        return None, str(error) or type(error).__name__
 
-    # Get next day to be clear in the status when thevacation ends
-    next_day = until_date + timedelta(days=1)
+    errors = [
+        f"{token_number + 1}. workspace: {result.get('error', 'unknown error')}"
+        for token_number, result in enumerate(results)
+        if not result.get('ok', False)
+    ]
+    if errors:
+        return None, ', '.join(errors)
 
-    return f"On vacation. Will be back on {next_day.strftime('%m')}/{next_day.strftime('%d')}"
+    return status, None
 
 
-def set_slack_status(slack_status: str) -> None:
+def run_planner(context: StatusContext, day_count: int) -> None:
     """
-    Sets the given status text to all workspaces defined in config
+    Plans the statuses of the working days ahead (see 'workingHours'), and writes them into
+    the schedule file. The meetings of the whole date range are fetched at once.
 
     Parameters:
-    slack_status: str - The status to be set.
+    context: StatusContext - The context of the user
+    day_count: int - The number of days to plan, starting today
 
     Returns:
     None
     """
 
-    # Loop through the api tokens provided in the config
-    token_number = 0
-    for token_number in range(len(config['slackApiTokens'])):
-        print(f"Configuring the {token_number + 1}. workspace...")
+    # The 'auto' start is the time of the run, it can only be planned for today
+    working_hours = context.config.get('workingHours', {})
+    if day_count > 1 and 'statusMessage' not in context.config and \
+            working_hours.get('start', 'auto') == 'auto':
+        print("Several days can only be planned with an explicit 'start' of the working hours " +
+            "(not 'auto')")
+        sys.exit(1)
 
-        # Send the request to slack
-        slack_response = slack.set_user_status(
-            token=config["slackApiTokens"][token_number],
-            status_message=status_message,
-            status_emoji=status_emoji,
-            status_expiry_date=status_expiry_date,
-            user_id=config['slackUserIds'][token_number]
+    days = planner.get_plan_days(context.now().date(), day_count, working_hours.get('days'))
+    if not days:
+        print('There are no working days to plan')
+        return
+
+    # Fetch the meetings of every day at once, and bucket them by their days
+    meetings = []
+    if 'statusMessage' not in context.config and working_hours.get('useIntegrations', True):
+        window = (
+            utils.get_day_bounds(context.time_zone, days[0])[0],
+            utils.get_day_bounds(context.time_zone, days[-1])[1]
         )
+        meetings = get_meetings_from_integrations(
+            context, window, working_hours.get('meetingSources'))
+    meetings_by_day = planner.bucket_meetings_by_day(meetings, context.time_zone)
 
-        # Log if it's not silenced
-        if not silent_output:
-            print('Slack response:')
-            print(slack_response)
+    planned_days = {}
+    for day in days:
+        try:
+            planned_days[day] = planner.plan_day(context, day, meetings_by_day.get(day, []))
+        except ValueError as error:
+            print(f"{day.isoformat()}: can't be planned: {error}")
+            continue
 
-        # Handle response
-        slack_response_status = slack_response.get('ok', False)
-        if slack_response_status is False:
-            slack_response_error = slack_response.get('error',
-                'Error not present in slack response!')
-            print(f'Error on setting slack status: {slack_response_error}')
-        else:
-            print('Done')
+        print(f"{day.isoformat()}: {planned_days[day]['status'].message}")
 
-        token_number += 1
+    file.write_schedule_file(planner.to_schedule_json(planned_days))
+    print(f"{len(planned_days)} day(s) planned into '{file.SCHEDULE_FILE_PATH}'")
 
 
-if __name__ == '__main__':
+def run_replay(context: StatusContext, use_timeline: bool, keep_running: bool,
+        interval: int) -> None:
+    """
+    Sets the statuses planned in the schedule file (see run_planner), without calculating
+    them or querying the integrations
 
-    # Read and set configuration into the global variables
-    config = file.read_configuration()
-    set_configuration()
+    Parameters:
+    context: StatusContext - The context of the user
+    use_timeline: bool - If set, the planned status of the current state (in a meeting,
+        on a break, available, done for the day) is set, otherwise the status of the day
+    keep_running: bool - If set, the statuses are set at the transitions and at the start of
+        every day, until stopped. Otherwise the current status is set once.
+    interval: int - The seconds between two updates, if it keeps running
 
-    # Check if vacation is supposed to be set based on the configuration
-    vacation_set = False
-    if 'vacation' in config and 'untilDate' in config['vacation']:
-        vacation_until = datetime.strptime(config['vacation']['untilDate'], '%Y-%m-%d')
-
-        # Set vacation if it's set to the future in the config
-        if vacation_until > datetime.now():
-            print(f"Vacation set in config until {config['vacation']['untilDate']}")
-            status_message = get_vacation_status(vacation_until)
-            vacation_set = True
-
-    if not vacation_set:
-
-        # Set base value for decisions
-        input_manually = False
-        input_fully_manually = False
-
-        # Check if the user wants to set the status fully manually (free text)
-        # or half manually (setting boundaries, meetings with fix time formats)
-        if utils.get_boolean_input("Do you want to set the status partially automatically?"):
-            status_message = get_half_manual_input()
-        else:
-            status_message = utils.get_text_input("Add the fix status message you want to set:")
+    Returns:
+    None
+    """
 
-    print('')
-    print("The final status message will be:")
-    print(status_message)
-    print('')
+    try:
+        while True:
 
-    # Set the final status to all workspaces
-    set_slack_status(status_message)
+            # The schedule is read again each time, so a new plan is picked up
+            schedule = file.read_schedule_file()
+            if schedule is None:
+                print(f"There is no schedule in '{file.SCHEDULE_FILE_PATH}', plan it first")
+                sys.exit(1)
+
+            now = context.now()
+            status, next_time = planner.get_scheduled_status(schedule, now, use_timeline)
+            if status:
+                print(f"[{now.strftime('%H:%M:%S')}] Status: {status.message}")
+                set_slack_status(context, status)
+            else:
+                print(f"[{now.strftime('%H:%M:%S')}] No status is planned for now")
+
+            if not keep_running:
+                return
+
+            # Sleep until the next tick, transition or the next day
+            wake_time = get_next_wake_time(context, None, [], interval)
+            if next_time:
+                wake_time = min(wake_time, next_time)
+            time.sleep(max((wake_time - context.now()).total_seconds(), 0))
+
+    except KeyboardInterrupt:
+        print('Replay stopped')
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parses the command line arguments
+
+    Returns:
+    The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description='Sets the Slack status in all workspaces.')
+    parser.add_argument('--daemon', action='store_true',
+        help='keep running and keep the status up to date')
+    parser.add_argument('--timeline', action='store_true',
+        help='run in daemon mode, following the meetings and breaks in real time with the status')
+    parser.add_argument('--interval', type=int,
+        help='seconds between two updates in daemon mode (default: daemonInterval config or 300)')
+    parser.add_argument('--roster',
+        help='set the status of every user of the roster file given, without any input')
+    parser.add_argument('--non-interactive', action='store_true',
+        help='calculate the status from the configuration (workingHours), without any input')
+    parser.add_argument('--start',
+        help='start of the working hours in hh:mm format, or auto (overrides workingHours)')
+    parser.add_argument('--end',
+        help='end of the working hours in hh:mm format (overrides workingHours)')
+    parser.add_argument('--duration',
+        help='length of the working hours in hh:mm format, if there is no end (default: 08:30)')
+    parser.add_argument('--break', dest='breaks', action='append', metavar='START-END',
+        help='a break in hh:mm-hh:mm format, can be repeated (overrides workingHours)')
+    parser.add_argument('--no-integrations', action='store_true',
+        help='leave the meetings of the integrations out of the status')
+    parser.add_argument('--status',
+        help='set this fix status message, without any input')
+    parser.add_argument('--plan', type=int, nargs='?', const=7, metavar='DAYS',
+        help='plan the statuses of the working days ahead into the schedule file (default: 7)')
+    parser.add_argument('--replay', action='store_true',
+        help='set the status planned in the schedule file (with --daemon: keep setting them)')
+
+    arguments = parser.parse_args()
+    if arguments.plan is not None and arguments.plan < 1:
+        parser.error('--plan: the number of days must be at least 1')
+
+    return arguments
+
+
+def get_argument_overrides(arguments: argparse.Namespace, config: Dict[str, any]) \
+        -> Dict[str, any]:
+    """
+    Collects the settings of the configuration overridden by the command line arguments
+
+    Parameters:
+    arguments: argparse.Namespace - The parsed arguments
+    config: Dict[str, any] - The configuration
+
+    Returns:
+    The overridden settings, to be merged into the configuration
+
+    Raises:
+    ValueError - If a break is not in the <hh:mm>-<hh:mm> format
+    """
+
+    overrides = {}
+    if arguments.status is not None:
+        overrides['statusMessage'] = arguments.status
+
+    working_hours = {}
+    if arguments.start:
+        working_hours['start'] = arguments.start
+    if arguments.end:
+        working_hours['end'] = arguments.end
+    if arguments.duration:
+        working_hours['duration'] = arguments.duration
+    if arguments.breaks:
+        working_hours['breaks'] = []
+        for break_range in arguments.breaks:
+            break_bounds = break_range.split('-')
+            if len(break_bounds) != 2 or not all(map(utils.is_input_an_hour, break_bounds)):
+                raise ValueError(f"The break '{break_range}' is not in <hh:mm>-<hh:mm> format")
+            working_hours['breaks'].append(break_bounds)
+    if arguments.no_integrations:
+        working_hours['useIntegrations'] = False
+
+    if working_hours:
+        overrides['workingHours'] = {**config.get('workingHours', {}), **working_hours}
+
+    return overrides
+
+
+if __name__ == '__main__':
+
+    arguments = parse_arguments()
+
+    # Read the configuration, and create the context of the status calculation from it
+    config = file.read_configuration()
+    context = create_context(config)
+
+    try:
+        overrides = get_argument_overrides(arguments, config)
+    except ValueError as error:
+        print(error)
+        sys.exit(1)
+    if overrides:
+        context = context.for_user(overrides)
+
+    # Any setting of the status on the command line implies the non-interactive mode
+    interactive = not arguments.non_interactive and not overrides
+
+    if arguments.plan is not None:
+        run_planner(context, arguments.plan)
+    elif arguments.replay:
+        run_replay(context, arguments.timeline, arguments.daemon or arguments.timeline,
+            arguments.interval or config.get('daemonInterval', 300))
+    elif arguments.roster:
+        run_batch(context, arguments.roster)
+    elif arguments.daemon or arguments.timeline:
+        run_daemon(context, arguments.interval or config.get('daemonInterval', 300),
+            arguments.timeline, interactive)
+    else:
+        run_once(context, interactive)
@@ -0,0 +1,405 @@
+"""
+    Contains the context of the status calculation: the configuration of a user,
+    and the calculation of the statuses from it
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, NamedTuple, Tuple
+
+from intervals import IntervalSet
+
+import timeline
+import utils
+
+# The settings of a user which are never taken from another user's configuration
+CREDENTIAL_SETTINGS = ('slackApiTokens', 'slackUserIds', 'integrations')
+
+
+class StatusResult(NamedTuple):
+    """
+    A status to be set in Slack
+    """
+
+    # The text of the status
+    message: str
+
+    # The emoji of the status
+    emoji: str
+
+    # The POSIX timestamp of the status' expiration
+    expiry_date: int
+
+
+class StatusContext:
+    """
+    Holds the configuration of a user (and the clients shared with other users), and
+    calculates the statuses from it. The context is not changed after it is created,
+    so any number of statuses (of any number of users or days) can be calculated with it
+    concurrently.
+    """
+
+    def __init__(self, config: Dict[str, any], slack_client=None) -> None:
+        """
+        Parameters:
+        config: Dict[str, any] - The configuration of the user, it must not be changed later
+        slack_client: slack.SlackClient - The client used to set the statuses
+        """
+
+        self.config = config
+        self.slack_client = slack_client
+
+        self.name = config.get('name')
+        self.time_zone = config['localTimeZone']
+        self.silent_output = config.get('silentOutput', True)
+        self.status_emoji = config.get('statusEmoji', ':speech_balloon:')
+        self.meeting_status_emoji = config.get('meetingStatusEmoji', ':calendar:')
+        self.break_status_emoji = config.get('breakStatusEmoji', ':coffee:')
+        self.done_status_emoji = config.get('doneStatusEmoji', ':house:')
+
+    def for_user(self, user_config: Dict[str, any],
+            inherit_credentials: bool = True) -> 'StatusContext':
+        """
+        Creates the context of another user, sharing the clients of this one.
+        The settings missing from the user's configuration are taken from this context.
+
+        Parameters:
+        user_config: Dict[str, any] - The configuration of the user
+        inherit_credentials: bool - If not set, the credentials (see CREDENTIAL_SETTINGS)
+            are not taken from this context, the user has to have their own
+
+        Returns:
+        The context of the user
+        """
+
+        base_config = self.config
+        if not inherit_credentials:
+            base_config = {
+                name: value
+                for name, value in self.config.items()
+                if name not in CREDENTIAL_SETTINGS
+            }
+
+        return StatusContext({**base_config, **user_config}, self.slack_client)
+
+    def now(self) -> datetime:
+        """
+        Returns the current time in the configured local timezone
+
+        Returns:
+        The timezone aware current time
+        """
+
+        return datetime.now(utils.get_local_zone(self.time_zone))
+
+    def get_day_end(self, day: date = None) -> datetime:
+        """
+        Returns the last second of a day in the configured local timezone
+
+        Parameters:
+        day: date - The day, default is today
+
+        Returns:
+        The timezone aware end of the day
+        """
+
+        return datetime.combine(day or self.now().date(), time(23, 59, 59),
+            tzinfo=utils.get_local_zone(self.time_zone))
+
+    def create_status(self, message: str) -> StatusResult:
+        """
+        Creates a status with the configured status emoji, expiring tonight
+
+        Parameters:
+        message: str - The text of the status
+
+        Returns:
+        The status
+        """
+
+        return StatusResult(message, self.status_emoji, int(self.get_day_end().timestamp()))
+
+    def create_status_message(self, time_windows: IntervalSet | List[Tuple[datetime, datetime]],
+            meetings: List[Tuple[datetime, datetime]]) -> str:
+        """
+        Creates the slack status message from the inputs gathered
+
+        Parameters:
+        time_windows: IntervalSet | List[Tuple[datetime, datetime]] - The available time windows
+            with breaks creating gaps
+        meetings: List[Tuple[datetime, datetime]] - Additional time windows
+            representing meetings
+
+        Returns:
+        A string containing the final status message
+        """
+
+        status_message = ""
+
+        # Add comma separated time windows' hours
+        index = 0
+        for time_window in time_windows:
+            status_message += \
+                f"{utils.format_hour(time_window[0], self.time_zone)} - " + \
+                f"{utils.format_hour(time_window[1], self.time_zone)}"
+
+            if index < len(time_windows) - 1:
+                status_message += ', '
+
+            index += 1
+
+        # Add meetings if they are apparent
+        if meetings:
+            status_message += f' ({self.meeting_status_emoji} '
+
+            index = 0
+            for meeting in meetings:
+                status_message += \
+                    f"{utils.format_hour(meeting[0], self.time_zone)} - " + \
+                    f"{utils.format_hour(meeting[1], self.time_zone)}"
+                if index < len(meetings) - 1:
+                    status_message += ', '
+
+                index += 1
+
+            status_message += ')'
+
+        return status_message
+
+    def create_plan_status_message(self, plan: Dict[str, any],
+            integration_meetings: List[Tuple[datetime, datetime]]) -> str:
+        """
+        Creates the slack status message from a plan of the day
+
+        Parameters:
+        plan: Dict[str, any] - The plan, see script.get_half_manual_plan
+        integration_meetings: List[Tuple[datetime, datetime]] - The meetings of the integrations,
+            only used if the plan uses the integrations
+
+        Returns:
+        A string containing the final status message
+        """
+
+        # Cut the breaks out of the working window
+        time_windows = IntervalSet([plan['working_window']])
+        for plan_break in plan['breaks']:
+            time_windows.subtract(plan_break)
+
+        return self.create_status_message(
+            time_windows, self.get_plan_meetings(plan, integration_meetings))
+
+    def get_plan_meetings(self, plan: Dict[str, any],
+            integration_meetings: List[Tuple[datetime, datetime]]) \
+            -> List[Tuple[datetime, datetime]]:
+        """
+        Collects the meetings of a plan
+
+        Parameters:
+        plan: Dict[str, any] - The plan, see script.get_half_manual_plan
+        integration_meetings: List[Tuple[datetime, datetime]] - The meetings of the integrations,
+            only used if the plan uses the integrations
+
+        Returns:
+        The meetings without duplicates, sorted by their start
+        """
+
+        meetings = list(plan['manual_meetings'])
+        if plan['use_integrations']:
+            meetings.extend(integration_meetings)
+
+        # Remove duplicates and sort
+        return sorted(dict.fromkeys(meetings), key=lambda x: x[0])
+
+    def get_auto_start(self) -> datetime:
+        """
+        Calculates the automatic start of the working day: the next quarter of an hour
+        (f.e. 08:15 at 08:02, 08:30 at 08:16)
+
+        Returns:
+        The timezone aware start of the working day
+        """
+
+        now = self.now().replace(second=0, microsecond=0)
+        quarters = max(-(-now.minute // 15), 1)
+        return now.replace(minute=0) + timedelta(minutes=quarters * 15)
+
+    def get_config_plan(self, integration_meetings: List[Tuple[datetime, datetime]] = (),
+            day: date = None) -> Dict[str, any]:
+        """
+        Creates the plan of a day from the 'workingHours' configuration, without any input,
+        the same way script.get_half_manual_plan does it from the inputs:
+            - The day starts at 'start' ('auto' for the next quarter of an hour, only today),
+                and ends at 'end', or 'duration' (default 08:30) after the start.
+            - The 'meetings' are added as manual meetings.
+            - The 'breaks' are either fix [start, end] pairs, or rules placing a break of
+                'duration' at 'after' the start of the day. A break placed by a rule is moved
+                to the end of the meetings it would overlap.
+
+        Parameters:
+        integration_meetings: List[Tuple[datetime, datetime]] - The meetings of the integrations,
+            the breaks placed by rules avoid them too
+        day: date - The day of the plan, default is today
+
+        Returns:
+        The plan as a dictionary, see script.get_half_manual_plan
+
+        Raises:
+        ValueError - If the working hours are not configured properly
+        """
+
+        working_hours = self.config['workingHours']
+
+        start = working_hours.get('start', 'auto')
+        if start != 'auto':
+            start_time = utils.parse_hour(start, self.time_zone, day)
+        elif day is None or day == self.now().date():
+            start_time = self.get_auto_start()
+        else:
+            raise ValueError("The 'auto' start can only be used for today")
+
+        if 'end' in working_hours:
+            end_time = utils.parse_hour(working_hours['end'], self.time_zone, day)
+        else:
+            end_time = start_time + utils.parse_duration(working_hours.get('duration', '08:30'))
+
+        if start_time >= end_time:
+            raise ValueError('The end of the working hours has to be after the start')
+
+        manual_meetings = [
+            (utils.parse_hour(meeting_start, self.time_zone, day),
+                utils.parse_hour(meeting_end, self.time_zone, day))
+            for meeting_start, meeting_end in working_hours.get('meetings', [])
+        ]
+
+        use_integrations = working_hours.get('useIntegrations', True)
+        busy_windows = IntervalSet(
+            manual_meetings + (list(integration_meetings) if use_integrations else []))
+
+        breaks = []
+        for break_config in working_hours.get('breaks', []):
+
+            # A rule needs its 'after', a fix break is a [start, end] pair
+            is_rule = isinstance(break_config, dict) and 'after' in break_config
+            is_pair = isinstance(break_config, (list, tuple)) and len(break_config) == 2
+            if not is_rule and not is_pair:
+                raise ValueError(f"The break {break_config!r} is neither a [start, end] pair " +
+                    "nor a rule with 'after'")
+
+            if is_rule:
+                break_start = start_time + utils.parse_duration(break_config['after'])
+                break_duration = utils.parse_duration(break_config.get('duration', '00:30'))
+
+                # Move the break after the meetings it would overlap
+                for busy_start, busy_end in busy_windows:
+                    if busy_start < break_start + break_duration and busy_end > break_start:
+                        break_start = busy_end
+
+                breaks.append((break_start, min(break_start + break_duration, end_time)))
+            else:
+                breaks.append((
+                    utils.parse_hour(break_config[0], self.time_zone, day),
+                    utils.parse_hour(break_config[1], self.time_zone, day)
+                ))
+
+        return {
+            'working_window': (start_time, end_time),
+            'breaks': [plan_break for plan_break in breaks if plan_break[0] < plan_break[1]],
+            'manual_meetings': sorted(manual_meetings),
+            'use_integrations': use_integrations,
+            'integration_meetings': list(integration_meetings)
+        }
+
+    def get_vacation_until(self, day: date = None) -> datetime | None:
+        """
+        Checks if vacation is supposed to be set based on the configuration.
+        This is the only definition of the vacation days, the 'untilDate' itself is not one.
+
+        Parameters:
+        day: date - The day to check, default is today
+
+        Returns:
+        The last day of the vacation if it is set after the day in the config, None otherwise
+        """
+
+        vacation = self.config.get('vacation', {})
+        if 'untilDate' in vacation:
+            vacation_until = datetime.strptime(vacation['untilDate'], '%Y-%m-%d') \
+                .replace(tzinfo=utils.get_local_zone(self.time_zone))
+
+            # Set vacation if it's set to the future in the config
+            if vacation_until.date() > (day or self.now().date()):
+                return vacation_until
+
+        return None
+
+    def get_vacation_status(self, until_date: datetime) -> StatusResult:
+        """
+        Produces the status for the vacation.
+
+        Parameters:
+        until_date: datetime - The date until the vacation lasts.
+
+        Returns:
+        The vacation status, expiring at the end of the vacation
+        """
+
+        expiry_date = int(until_date.replace(
+            hour=23, minute=59, second=59).timestamp())  # Until last day of vacation
+        emoji = self.config['vacation'].get('statusEmoji', ':palm_tree:')
+
+        # Get next day to be clear in the status when thevacation ends
+        next_day = until_date + timedelta(days=1)
+
+        return StatusResult(
+            f"On vacation. Will be back on {next_day.strftime('%m')}/{next_day.strftime('%d')}",
+            emoji,
+            expiry_date
+        )
+
+    def get_plan_timeline(self, plan: Dict[str, any],
+            integration_meetings: List[Tuple[datetime, datetime]]) -> List[timeline.Transition]:
+        """
+        Calculates the transitions of the day from a plan
+
+        Parameters:
+        plan: Dict[str, any] - The plan of the day, see script.get_half_manual_plan
+        integration_meetings: List[Tuple[datetime, datetime]] - The meetings of the integrations
+
+        Returns:
+        The transitions of the day in time order
+        """
+
+        meetings = list(plan['manual_meetings'])
+        if plan['use_integrations']:
+            meetings.extend(integration_meetings)
+
+        day_end = plan['working_window'][0].replace(hour=23, minute=59, second=59, microsecond=0)
+        return timeline.build_timeline(plan['working_window'], plan['breaks'], meetings, day_end)
+
+    def get_transition_status(self, transition: timeline.Transition,
+            overview_message: str) -> StatusResult:
+        """
+        Creates the status of a state of the timeline
+
+        Parameters:
+        transition: timeline.Transition - The transition to the state
+        overview_message: str - The status message listing the windows and meetings of the day,
+            used while the user is available
+
+        Returns:
+        The status, expiring at the next transition
+        """
+
+        _, state, until = transition
+        expiry_date = int(until.timestamp())
+        until_text = utils.format_hour(until, self.time_zone)
+
+        if state == timeline.STATE_MEETING:
+            return StatusResult(
+                f"In a meeting until {until_text}", self.meeting_status_emoji, expiry_date)
+        elif state == timeline.STATE_BREAK:
+            return StatusResult(
+                f"On a break until {until_text}", self.break_status_emoji, expiry_date)
+        elif state == timeline.STATE_DONE:
+            return StatusResult('Done for the day', self.done_status_emoji, expiry_date)
+        else:
+            return StatusResult(overview_message, self.status_emoji, expiry_date)
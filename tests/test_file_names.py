@@ -0,0 +1,21 @@
+"""
+    Tests the conversion of the user names into file names
+"""
+
+import utils
+
+
+def test_safe_name_is_kept():
+    assert utils.get_file_name('alice_01-x') == 'alice_01-x'
+
+
+def test_unsafe_characters_are_replaced():
+    file_name = utils.get_file_name('../alice')
+
+    assert '/' not in file_name and '.' not in file_name
+    assert file_name.startswith('___alice_')
+
+
+def test_sanitized_names_do_not_collide():
+    assert utils.get_file_name('a.b') != utils.get_file_name('a/b')
+    assert utils.get_file_name('a.b') != utils.get_file_name('a_b')
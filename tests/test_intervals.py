@@ -0,0 +1,88 @@
+"""
+    Tests of the sorted interval set
+"""
+
+from datetime import datetime, timezone
+
+from intervals import IntervalSet
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2024, 1, 1, hour, minute, tzinfo=timezone.utc)
+
+
+def test_constructor_merges_overlapping_and_touching_intervals() -> None:
+    intervals = IntervalSet([(at(12), at(13)), (at(8), at(10)), (at(9), at(11)), (at(11), at(12))])
+
+    assert intervals.to_list() == [(at(8), at(13))]
+
+
+def test_constructor_skips_empty_intervals() -> None:
+    assert IntervalSet([(at(9), at(9)), (at(10), at(9))]).to_list() == []
+
+
+def test_add_merges_adjacent_intervals() -> None:
+    intervals = IntervalSet([(at(8), at(9))]).add((at(9), at(10)))
+
+    assert intervals.to_list() == [(at(8), at(10))]
+
+
+def test_add_merges_every_overlapped_interval() -> None:
+    intervals = IntervalSet([(at(8), at(9)), (at(10), at(11)), (at(12), at(13))])
+    intervals.add((at(8, 30), at(12)))
+
+    assert intervals.to_list() == [(at(8), at(13))]
+
+
+def test_add_keeps_separate_intervals_sorted() -> None:
+    intervals = IntervalSet([(at(12), at(13))]).add((at(8), at(9))).add((at(10), at(11)))
+
+    assert intervals.to_list() == [(at(8), at(9)), (at(10), at(11)), (at(12), at(13))]
+
+
+def test_subtract_splits_an_interval() -> None:
+    intervals = IntervalSet([(at(8), at(16))]).subtract((at(10), at(11)))
+
+    assert intervals.to_list() == [(at(8), at(10)), (at(11), at(16))]
+
+
+def test_subtract_at_the_left_edge() -> None:
+    intervals = IntervalSet([(at(8), at(16))]).subtract((at(8), at(9)))
+
+    assert intervals.to_list() == [(at(9), at(16))]
+
+
+def test_subtract_at_the_right_edge() -> None:
+    intervals = IntervalSet([(at(8), at(16))]).subtract((at(15), at(16)))
+
+    assert intervals.to_list() == [(at(8), at(15))]
+
+
+def test_subtract_sticking_out_on_both_sides() -> None:
+    intervals = IntervalSet([(at(8), at(9)), (at(10), at(11))]).subtract((at(7), at(12)))
+
+    assert intervals.to_list() == []
+
+
+def test_subtract_spanning_several_intervals() -> None:
+    intervals = IntervalSet([(at(8), at(10)), (at(11), at(12)), (at(13), at(15))])
+    intervals.subtract((at(9), at(14)))
+
+    assert intervals.to_list() == [(at(8), at(9)), (at(14), at(15))]
+
+
+def test_subtract_only_touching_an_interval_keeps_it() -> None:
+    intervals = IntervalSet([(at(8), at(10))])
+    intervals.subtract((at(10), at(11))).subtract((at(7), at(8)))
+
+    assert intervals.to_list() == [(at(8), at(10))]
+
+
+def test_find_includes_the_boundaries() -> None:
+    intervals = IntervalSet([(at(8), at(10)), (at(12), at(13))])
+
+    assert intervals.find(at(8)) == (at(8), at(10))
+    assert intervals.find(at(10)) == (at(8), at(10))
+    assert intervals.find(at(11)) is None
+    assert intervals.contains(at(13))
+    assert not intervals.contains(at(7))
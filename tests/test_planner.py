@@ -0,0 +1,34 @@
+"""
+    Tests of the planning of the statuses of several days
+"""
+
+from datetime import date
+
+import planner
+
+from status_context import StatusContext
+
+CONTEXT = StatusContext({
+    'localTimeZone': 'UTC',
+    'vacation': {'untilDate': '2024-01-03'},
+    'workingHours': {'start': '09:00', 'end': '17:00', 'useIntegrations': False}
+})
+
+
+def test_days_before_the_until_date_are_vacation() -> None:
+    status = planner.plan_day(CONTEXT, date(2024, 1, 2), [])['status']
+
+    assert status.message.startswith('On vacation')
+
+
+def test_until_date_is_planned_as_a_working_day() -> None:
+    status = planner.plan_day(CONTEXT, date(2024, 1, 3), [])['status']
+
+    assert not status.message.startswith('On vacation')
+    assert CONTEXT.get_vacation_until(date(2024, 1, 3)) is None
+
+
+def test_plan_days_lists_the_working_days_of_the_range() -> None:
+    days = planner.get_plan_days(date(2024, 1, 5), 4)
+
+    assert days == [date(2024, 1, 5), date(2024, 1, 8)]
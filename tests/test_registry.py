@@ -0,0 +1,76 @@
+"""
+    Tests of the concurrent fetching of the providers
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from datetime import datetime, timezone
+
+import pytest
+
+from integrations import registry
+from integrations.provider import CalendarProvider
+
+WINDOW = (
+    datetime(2024, 1, 1, tzinfo=timezone.utc),
+    datetime(2024, 1, 2, tzinfo=timezone.utc)
+)
+
+# Fetches a provider which never returns, then exits
+HANGING_PROVIDER_SCRIPT = '''
+import threading
+from datetime import datetime, timezone
+from integrations import registry
+from integrations.provider import CalendarProvider
+
+class HangingProvider(CalendarProvider):
+    def fetch_meetings(self, window):
+        threading.Event().wait()
+
+window = (datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 2, tzinfo=timezone.utc))
+print(registry.fetch_all([HangingProvider({}, 0, 'UTC')], window, 0.1))
+'''
+
+
+class StaticProvider(CalendarProvider):
+    def __init__(self, result) -> None:
+        super().__init__({}, 0, 'UTC')
+        self.result = result
+
+    def fetch_meetings(self, window):
+        if isinstance(self.result, Exception):
+            raise self.result
+        if self.result is None:
+            time.sleep(1)
+        return self.result
+
+
+def test_results_are_in_the_order_of_the_providers():
+    error = ValueError('failed')
+    results = registry.fetch_all(
+        [StaticProvider([WINDOW]), StaticProvider(error), StaticProvider(None)], WINDOW, 0.5)
+
+    assert results == [[WINDOW], error, None]
+
+
+def test_hanging_provider_does_not_keep_the_process_alive():
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run([sys.executable, '-c', HANGING_PROVIDER_SCRIPT],
+        cwd=repo_root, capture_output=True, text=True, timeout=10)
+
+    assert completed.returncode == 0
+    assert completed.stdout.strip() == '[None]'
+
+
+class IncompleteProvider(CalendarProvider):
+    display_name = 'Incomplete'
+
+
+def test_provider_without_fetch_meetings_fails_when_created(monkeypatch) -> None:
+    monkeypatch.setitem(registry.PROVIDERS, 'incomplete', 'test_registry:IncompleteProvider')
+
+    with pytest.raises(TypeError):
+        registry.create_providers({'incomplete': [{'enabled': True}]}, 'UTC')
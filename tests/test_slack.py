@@ -0,0 +1,133 @@
+"""
+    Tests of the rate limiting of the Slack client: the token bucket throttling the requests,
+    and the retries of the rate limited requests
+"""
+
+import pytest
+
+# The Slack client needs the requests package
+slack = pytest.importorskip('integrations.slack')
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: dict | None, headers: dict = None) -> None:
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self) -> dict:
+        if self.body is None:
+            raise ValueError('No JSON body')
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, responses: list) -> None:
+        self.responses = list(responses)
+        self.requests = []
+
+    def post(self, **request) -> FakeResponse:
+        self.requests.append(request)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list:
+    now = [1000.0]
+    monkeypatch.setattr(slack.time, 'monotonic', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def sleeps(clock: list, monkeypatch: pytest.MonkeyPatch) -> list:
+    waits = []
+
+    def sleep(seconds: float) -> None:
+        waits.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(slack.time, 'sleep', sleep)
+
+    # The largest backoff is taken, so the waits are known
+    monkeypatch.setattr(slack.random, 'uniform', lambda low, high: high)
+    return waits
+
+
+def create_client(responses: list, max_retries: int = 5) -> 'slack.SlackClient':
+    client = slack.SlackClient(max_retries=max_retries, backoff_base=0.5)
+    client.session = FakeSession(responses)
+    return client
+
+
+def test_burst_up_to_the_capacity_is_not_throttled(clock: list) -> None:
+    bucket = slack.TokenBucket(60)
+
+    assert [bucket.acquire() for _ in range(60)] == [0] * 60
+    assert bucket.acquire() == pytest.approx(1)
+    assert bucket.acquire() == pytest.approx(2)
+
+
+def test_tokens_are_refilled_over_time(clock: list) -> None:
+    bucket = slack.TokenBucket(60)
+    for _ in range(61):
+        bucket.acquire()
+
+    clock[0] += 2
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(1)
+
+
+def test_refill_is_capped_at_the_capacity(clock: list) -> None:
+    bucket = slack.TokenBucket(2)
+
+    clock[0] += 3600
+
+    assert [bucket.acquire() for _ in range(2)] == [0, 0]
+    assert bucket.acquire() == pytest.approx(30)
+
+
+def test_pause_blocks_the_bucket(clock: list) -> None:
+    bucket = slack.TokenBucket(60)
+    bucket.pause(5)
+
+    assert bucket.acquire() == pytest.approx(5)
+
+    clock[0] += 5
+
+    assert bucket.acquire() == 0
+
+
+def test_rate_limited_request_is_retried_after_retry_after_and_backoff(sleeps: list) -> None:
+    client = create_client([
+        FakeResponse(429, {'ok': False, 'error': 'ratelimited'}, {'Retry-After': '2'}),
+        FakeResponse(200, {'ok': True})
+    ])
+
+    assert client.call('users.profile.set', 'xoxp-1', {}) == {'ok': True}
+    assert len(client.session.requests) == 2
+    assert sleeps == [pytest.approx(2.5)]
+    assert client.get_stats()['retries'] == 1
+
+
+def test_ratelimited_error_without_429_is_retried(sleeps: list) -> None:
+    client = create_client([
+        FakeResponse(200, {'ok': False, 'error': 'ratelimited'}),
+        FakeResponse(200, {'ok': True})
+    ])
+
+    assert client.call('users.profile.set', 'xoxp-1', {}) == {'ok': True}
+    assert sleeps == [pytest.approx(0.5)]
+
+
+def test_backoff_doubles_and_the_last_non_json_429_is_returned(sleeps: list) -> None:
+    client = create_client([
+        FakeResponse(429, None, {'Retry-After': 'soon'}) for _ in range(3)
+    ], max_retries=2)
+
+    response = client.call('users.profile.set', 'xoxp-1', {})
+
+    assert response == {'ok': False, 'error': 'HTTP 429'}
+    assert len(client.session.requests) == 3
+    assert sleeps == [pytest.approx(0.5), pytest.approx(1)]
+    assert client.get_stats()['retries'] == 2
@@ -0,0 +1,100 @@
+"""
+    Tests of the snapshot cache of the integrations
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from datetime import datetime, timezone
+
+import pytest
+
+from integrations import snapshot
+from integrations.provider import CalendarProvider
+
+WINDOW = (
+    datetime(2100, 1, 1, tzinfo=timezone.utc),
+    datetime(2100, 1, 2, tzinfo=timezone.utc)
+)
+
+MEETING = (
+    datetime(2100, 1, 1, 9, tzinfo=timezone.utc),
+    datetime(2100, 1, 1, 10, tzinfo=timezone.utc)
+)
+
+
+class FakeProvider(CalendarProvider):
+    def __init__(self, fetch) -> None:
+        super().__init__({}, 0, 'UTC')
+        self.fetch_function = fetch
+
+    def fetch_meetings(self, window):
+        return self.fetch_function(window)
+
+
+def failing_fetch(window):
+    raise OSError('unreachable')
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, '__get_snapshot_path',
+        lambda key: os.path.join(tmp_path, f'snapshot_{key}.json'))
+
+
+def age_snapshot(key: str, seconds: float) -> None:
+    snapshots = getattr(snapshot, '__read_snapshot_file')(key)
+    for window_snapshot in snapshots.values():
+        window_snapshot['fetchedAt'] -= seconds
+    snapshot.file.write_json_file(getattr(snapshot, '__get_snapshot_path')(key), snapshots)
+
+
+def test_failed_fetch_serves_the_snapshot_without_replacing_it():
+    provider = FakeProvider(failing_fetch)
+    snapshot.write_snapshot(provider.key, WINDOW, [MEETING])
+    age_snapshot(provider.key, 7200)
+
+    cached = snapshot.SnapshotProvider(provider, ttl=60, max_stale=3600, timeout=1)
+
+    assert asyncio.run(cached.fetch(WINDOW)) == [MEETING]
+    assert snapshot.read_snapshot(provider.key, WINDOW)['meetings'] == [MEETING]
+
+
+def test_failed_fetch_without_snapshot_raises():
+    cached = snapshot.SnapshotProvider(FakeProvider(failing_fetch), ttl=60, max_stale=3600)
+
+    with pytest.raises(OSError):
+        asyncio.run(cached.fetch(WINDOW))
+
+
+def test_successful_fetch_replaces_the_snapshot():
+    provider = FakeProvider(lambda window: [])
+    snapshot.write_snapshot(provider.key, WINDOW, [MEETING])
+    age_snapshot(provider.key, 7200)
+
+    cached = snapshot.SnapshotProvider(provider, ttl=60, max_stale=3600, timeout=1)
+
+    assert asyncio.run(cached.fetch(WINDOW)) == []
+    assert snapshot.read_snapshot(provider.key, WINDOW)['meetings'] == []
+
+
+def test_hanging_refresh_gives_up_after_the_timeout():
+    released = threading.Event()
+    provider = FakeProvider(lambda window: released.wait())
+    snapshot.write_snapshot(provider.key, WINDOW, [MEETING])
+
+    try:
+        snapshot.refresh_in_background(provider, WINDOW, 0.1)
+        refresh_threads = [
+            thread for thread in threading.enumerate() if thread.name.startswith('snapshot-')
+        ]
+        started_at = time.monotonic()
+        for thread in refresh_threads:
+            thread.join(5)
+
+        assert time.monotonic() - started_at < 5
+        assert snapshot.read_snapshot(provider.key, WINDOW)['meetings'] == [MEETING]
+    finally:
+        released.set()
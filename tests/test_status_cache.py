@@ -0,0 +1,78 @@
+"""
+    Tests of the skipping of the Slack updates which would not change the status
+"""
+
+import pytest
+
+import file
+import utils
+
+# The script needs the requests package
+pytest.importorskip('requests')
+
+import script  # noqa: E402
+
+from status_context import StatusContext, StatusResult  # noqa: E402
+
+
+class FakeSlackClient:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def set_user_status(self, **request) -> dict:
+        self.calls.append((request['token'], request['user_id'], request['status_message']))
+        return {'ok': True}
+
+    def get_stats(self) -> dict:
+        return {'requests': len(self.calls), 'retries': 0, 'throttled_seconds': 0}
+
+
+@pytest.fixture(autouse=True)
+def status_file(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(file, 'STATUS_FILE_PATH', str(tmp_path / 'status_cache.json'))
+
+
+def create_context(tokens: list, user_ids: list) -> StatusContext:
+    return StatusContext({
+        'localTimeZone': 'UTC',
+        'slackApiTokens': tokens,
+        'slackUserIds': user_ids
+    }, FakeSlackClient())
+
+
+def test_unchanged_status_is_skipped_and_changed_one_is_sent() -> None:
+    context = create_context(['xoxp-1'], ['U1'])
+    status = StatusResult('09:00 - 17:00', ':speech_balloon:', 0)
+
+    assert script.set_slack_status(context, status, report=False) == [{'ok': True}]
+    assert script.set_slack_status(context, status, report=False) == \
+        [{'ok': True, 'skipped': True}]
+    assert len(context.slack_client.calls) == 1
+
+    script.set_slack_status(context, status._replace(message='10:00 - 18:00'), report=False)
+
+    assert context.slack_client.calls[-1] == ('xoxp-1', 'U1', '10:00 - 18:00')
+    assert len(context.slack_client.calls) == 2
+
+
+def test_status_is_remembered_per_token_and_user() -> None:
+    status = StatusResult('09:00 - 17:00', ':speech_balloon:', 0)
+    script.set_slack_status(create_context(['xoxp-1'], ['U1']), status, report=False)
+
+    context = create_context(['xoxp-1', 'xoxp-1', 'xoxp-2'], ['U1', 'U2', 'U1'])
+    script.set_slack_status(context, status, report=False)
+
+    assert context.slack_client.calls == [
+        ('xoxp-1', 'U2', '09:00 - 17:00'),
+        ('xoxp-2', 'U1', '09:00 - 17:00')
+    ]
+
+
+def test_workspace_key_depends_on_the_token_and_the_user() -> None:
+    keys = {
+        utils.get_workspace_key(token, user_id)
+        for token in ['xoxp-1', 'xoxp-2'] for user_id in ['U1', 'U2']
+    }
+
+    assert len(keys) == 4
+    assert 'xoxp-1' not in ''.join(keys)
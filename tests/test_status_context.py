@@ -0,0 +1,48 @@
+"""
+    Tests of the plan of a day calculated from the 'workingHours' configuration
+"""
+
+from datetime import date, datetime, timezone
+
+import pytest
+
+from status_context import StatusContext
+
+DAY = date(2024, 1, 1)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2024, 1, 1, hour, minute, tzinfo=timezone.utc)
+
+
+def create_context(breaks: list) -> StatusContext:
+    return StatusContext({
+        'localTimeZone': 'UTC',
+        'workingHours': {'start': '09:00', 'end': '17:00', 'breaks': breaks}
+    })
+
+
+def test_fix_break_is_kept() -> None:
+    plan = create_context([['12:00', '12:30']]).get_config_plan(day=DAY)
+
+    assert plan['working_window'] == (at(9), at(17))
+    assert plan['breaks'] == [(at(12), at(12, 30))]
+
+
+def test_break_rule_is_placed_after_the_start_and_moved_after_the_meetings() -> None:
+    context = create_context([{'after': '04:00', 'duration': '00:30'}])
+
+    assert context.get_config_plan(day=DAY)['breaks'] == [(at(13), at(13, 30))]
+    assert context.get_config_plan([(at(12, 45), at(13, 15))], DAY)['breaks'] == \
+        [(at(13, 15), at(13, 45))]
+
+
+@pytest.mark.parametrize('break_config', [
+    {'duration': '00:30'},
+    ['12:00'],
+    ['12:00', '12:30', '13:00'],
+    '12:00-12:30'
+])
+def test_malformed_break_raises_value_error(break_config) -> None:
+    with pytest.raises(ValueError, match='break'):
+        create_context([break_config]).get_config_plan(day=DAY)
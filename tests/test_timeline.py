@@ -0,0 +1,76 @@
+"""
+    Tests of the timeline of a day and its scheduler
+"""
+
+from datetime import datetime, timezone
+
+import timeline
+
+from timeline import STATE_AVAILABLE, STATE_BREAK, STATE_DONE, STATE_MEETING
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(2024, 1, 1, hour, minute, tzinfo=timezone.utc)
+
+
+DAY_END = datetime(2024, 1, 1, 23, 59, 59, tzinfo=timezone.utc)
+
+
+def test_available_before_the_start_and_done_after_the_end() -> None:
+    transitions = timeline.build_timeline((at(9), at(17)), [], [], DAY_END)
+
+    assert transitions == [
+        (at(0), STATE_AVAILABLE, at(17)),
+        (at(17), STATE_DONE, DAY_END)
+    ]
+
+
+def test_meetings_and_breaks_change_the_state() -> None:
+    transitions = timeline.build_timeline(
+        (at(9), at(17)), [(at(12), at(12, 30))], [(at(10), at(11))], DAY_END)
+
+    assert transitions == [
+        (at(0), STATE_AVAILABLE, at(10)),
+        (at(10), STATE_MEETING, at(11)),
+        (at(11), STATE_AVAILABLE, at(12)),
+        (at(12), STATE_BREAK, at(12, 30)),
+        (at(12, 30), STATE_AVAILABLE, at(17)),
+        (at(17), STATE_DONE, DAY_END)
+    ]
+
+
+def test_meetings_take_precedence_over_breaks() -> None:
+    transitions = timeline.build_timeline(
+        (at(9), at(17)), [(at(12), at(13))], [(at(12, 30), at(14))], DAY_END)
+
+    assert [(start, state) for start, state, _ in transitions] == [
+        (at(0), STATE_AVAILABLE),
+        (at(12), STATE_BREAK),
+        (at(12, 30), STATE_MEETING),
+        (at(14), STATE_AVAILABLE),
+        (at(17), STATE_DONE)
+    ]
+
+
+def test_windows_outside_of_the_working_hours_are_ignored() -> None:
+    transitions = timeline.build_timeline(
+        (at(9), at(17)), [], [(at(7), at(8)), (at(16), at(18))], DAY_END)
+
+    assert transitions == [
+        (at(0), STATE_AVAILABLE, at(16)),
+        (at(16), STATE_MEETING, at(17)),
+        (at(17), STATE_DONE, DAY_END)
+    ]
+
+
+def test_scheduler_hands_out_the_latest_due_transition_once() -> None:
+    scheduler = timeline.TransitionScheduler()
+    scheduler.schedule(timeline.build_timeline(
+        (at(9), at(17)), [], [(at(10), at(11))], DAY_END))
+
+    assert scheduler.pop_due(at(10, 30))[1] == STATE_MEETING
+    assert scheduler.pop_due(at(10, 30)) is None
+    assert scheduler.next_time() == at(11)
+
+    assert scheduler.pop_due(DAY_END)[1] == STATE_DONE
+    assert scheduler.next_time() is None
@@ -0,0 +1,44 @@
+"""
+    Tests of the normalization of the meetings of the integrations
+"""
+
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import utils
+
+AMSTERDAM = ZoneInfo('Europe/Amsterdam')
+
+
+def utc(*fields: int) -> datetime:
+    return datetime(*fields, tzinfo=timezone.utc)
+
+
+WINDOW = (
+    datetime(2024, 1, 1, tzinfo=AMSTERDAM),
+    datetime(2024, 1, 2, tzinfo=AMSTERDAM)
+)
+
+
+def test_normalize_meetings_converts_every_time_to_utc() -> None:
+    meetings = utils.normalize_meetings([
+        ('2024-01-01T10:00:00+01:00', '2024-01-01T11:00:00+01:00', None),
+        ('2024-01-01T12:00:00', '2024-01-01T13:00:00', None),
+        ('2024-01-01T13:00:00.0000000', '2024-01-01T14:00:00.0000000', 'UTC')
+    ], 'Europe/Amsterdam', WINDOW)
+
+    assert meetings == [
+        (utc(2024, 1, 1, 9), utc(2024, 1, 1, 10)),
+        (utc(2024, 1, 1, 11), utc(2024, 1, 1, 12)),
+        (utc(2024, 1, 1, 13), utc(2024, 1, 1, 14))
+    ]
+
+
+def test_normalize_meetings_keeps_the_meetings_starting_in_the_window() -> None:
+    meetings = utils.normalize_meetings([
+        ('2023-12-31T23:30:00+01:00', '2024-01-01T00:30:00+01:00', None),
+        ('2024-01-01T00:00:00+01:00', '2024-01-01T00:30:00+01:00', None),
+        ('2024-01-02T00:00:00+01:00', '2024-01-02T00:30:00+01:00', None)
+    ], 'Europe/Amsterdam', WINDOW)
+
+    assert meetings == [(utc(2023, 12, 31, 23), utc(2023, 12, 31, 23, 30))]
@@ -0,0 +1,141 @@
+"""
+    Contains the timeline of a day: the points where the state of the user changes
+    (f.e. a meeting starts), and the scheduler firing them in order.
+"""
+
+import heapq
+
+from datetime import datetime
+from typing import List, Tuple
+
+# The states of the user
+STATE_AVAILABLE = 'available'
+STATE_MEETING = 'meeting'
+STATE_BREAK = 'break'
+STATE_DONE = 'done'
+
+# A transition: (the time of the change, the new state, the time of the next change)
+Transition = Tuple[datetime, str, datetime]
+
+
+def build_timeline(working_window: Tuple[datetime, datetime],
+        breaks: List[Tuple[datetime, datetime]], meetings: List[Tuple[datetime, datetime]],
+        day_end: datetime) -> List[Transition]:
+    """
+    Calculates every transition of the day with a single sweep over the sorted boundaries
+    of the meetings and breaks. Meetings take precedence over breaks, the parts of them
+    outside of the working window are ignored.
+
+    Parameters:
+    working_window: Tuple[datetime, datetime] - The start and end of the working day
+    breaks: List[Tuple[datetime, datetime]] - The breaks
+    meetings: List[Tuple[datetime, datetime]] - The meetings
+    day_end: datetime - The end of the day, the end of the last (done) state
+
+    Returns:
+    The transitions in time order, starting at midnight. The user is available until
+    the working window starts, and done for the day after it ends.
+    """
+
+    work_start, work_end = working_window
+
+    # The boundaries as (time, meeting counter change, break counter change)
+    boundaries = [(work_start, 0, 0)]
+    for windows, is_meeting in ((meetings, True), (breaks, False)):
+        for start, end in windows:
+            start, end = max(start, work_start), min(end, work_end)
+            if start >= end:
+                continue
+
+            boundaries.append((start, 1, 0) if is_meeting else (start, 0, 1))
+            boundaries.append((end, -1, 0) if is_meeting else (end, 0, -1))
+    boundaries.sort(key=lambda boundary: boundary[0])
+
+    # Sweep through the boundaries, the state can only change where a boundary is
+    day_start = work_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    changes = [(day_start, STATE_AVAILABLE)]
+    meeting_count = 0
+    break_count = 0
+    index = 0
+    while index < len(boundaries):
+        time = boundaries[index][0]
+
+        # Apply every boundary at the same time at once
+        while index < len(boundaries) and boundaries[index][0] == time:
+            meeting_count += boundaries[index][1]
+            break_count += boundaries[index][2]
+            index += 1
+
+        if meeting_count > 0:
+            state = STATE_MEETING
+        elif break_count > 0:
+            state = STATE_BREAK
+        else:
+            state = STATE_AVAILABLE
+
+        if state != changes[-1][1]:
+            changes.append((time, state))
+
+    # The working window's end overrides the states changing at the same time
+    while len(changes) > 1 and changes[-1][0] >= work_end:
+        changes.pop()
+    changes.append((work_end, STATE_DONE))
+
+    # Set the end of each state
+    transitions = []
+    for index in range(len(changes)):
+        until = changes[index + 1][0] if index + 1 < len(changes) else day_end
+        transitions.append((changes[index][0], changes[index][1], until))
+
+    return transitions
+
+
+class TransitionScheduler:
+    """
+    Min-heap of the transitions of a day, ordered by their time.
+    Hands out each transition once, when its time has come.
+    """
+
+    def __init__(self) -> None:
+        self.heap = []
+
+    def schedule(self, transitions: List[Transition]) -> None:
+        """
+        Replaces the scheduled transitions, f.e. after the meetings have changed
+
+        Parameters:
+        transitions: List[Transition] - The transitions of the day
+
+        Returns:
+        None
+        """
+
+        self.heap = list(transitions)
+        heapq.heapify(self.heap)
+
+    def pop_due(self, now: datetime) -> Transition | None:
+        """
+        Removes the transitions whose time has come
+
+        Parameters:
+        now: datetime - The current time
+
+        Returns:
+        The latest transition which is due (the current state), None if none of them is due
+        """
+
+        due_transition = None
+        while self.heap and self.heap[0][0] <= now:
+            due_transition = heapq.heappop(self.heap)
+
+        return due_transition
+
+    def next_time(self) -> datetime | None:
+        """
+        Returns the time of the next transition
+
+        Returns:
+        The time of the next scheduled transition, None if there are no more
+        """
+
+        return self.heap[0][0] if self.heap else None
@@ -2,13 +2,24 @@
     Contains some utility functions used by the main 'script.py' file
 """
 
+import hashlib
 import re
 
-from datetime import datetime
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
 from typing import Dict, List, Tuple
-from zoneinfo import ZoneInfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-import file
+from intervals import IntervalSet
+
+# The fractional seconds of an ISO 8601 datetime string
+FRACTION_PATTERN = re.compile(r'\.(\d+)')
+
+# A duration in hh:mm format
+DURATION_PATTERN = re.compile(r'^\d{1,3}:[0-5][0-9]$')
+
+# The characters not allowed in the file names derived from the user names
+UNSAFE_FILE_NAME_PATTERN = re.compile(r'[^A-Za-z0-9_-]')
 
 
 def is_input_an_hour(input: str) -> bool:
@@ -71,8 +82,8 @@ def get_text_input(prompt: str) -> str:
 
 
 def get_hour_input(
-        prompt: str, available_windows: List[Tuple[datetime, datetime]] = None,
-        after_than: datetime = None) -> datetime:
+        prompt: str, available_windows: IntervalSet | List[Tuple[datetime, datetime]] = None,
+        after_than: datetime = None, time_zone: str = None) -> datetime:
     """
     Reads input from user until their anwser can
     be interpreted as an hour that applies to the conditions
@@ -80,12 +91,14 @@ def get_hour_input(
     Parameters:
     prompt: str - The text that will appear in the terminal
         before the input is taken
-    available_windows: List[Tuple[datetime, datetime]] - List of windows that are still
+    available_windows: IntervalSet | List[Tuple[datetime, datetime]] - Windows that are still
         available to take. If set, input is checkd if it's inside these windows.
         f.e. [Tuple(08:00, 10:00), Tuple(11:00, 12:00)]
         (the hour is checkedwith the day set as today)
     after_than: datetime - If set, only an hour after the parameter (equal is fine)
         will count as a valid option (with the day set as today)
+    time_zone: str - The timezone string (f.e. 'Europe/Amsterdam'). If set, the input is
+        taken in this timezone and the result is timezone aware
 
     Returns:
     A datetime object set for today as the day and the
@@ -94,6 +107,9 @@ def get_hour_input(
 
     print(prompt + " (hh:mm)")
 
+    if not isinstance(available_windows, IntervalSet):
+        available_windows = IntervalSet(available_windows or [])
+
     # Set up a forever loop, exit if the input is valid
     while True:
 
@@ -106,27 +122,28 @@ def get_hour_input(
             continue
 
         # Convert input into python datetime object
-        datetime_input = __convert_hour_input(user_input)
+        datetime_input = __convert_hour_input(user_input, time_zone)
 
         # Check if input is in windows, with or without after_than being set
         if not __check_input_in_windows(datetime_input, available_windows, after_than):
-            print(__get_windows_error_message(available_windows, after_than))
+            print(__get_windows_error_message(available_windows, after_than, time_zone))
             continue
 
         # If haven't continued so far: break
         break
 
     # Convert hour input into datetime object
-    input_datetime_input = __convert_hour_input(user_input)
+    input_datetime_input = __convert_hour_input(user_input, time_zone)
     return input_datetime_input
 
 
-def __convert_hour_input(input: str) -> datetime:
+def __convert_hour_input(input: str, time_zone: str = None) -> datetime:
     """
     Converts hour input text (hh:mm) as python datetime
 
     Parameters:
     input: str - The text input taken from the user (format is "hh:mm")
+    time_zone: str - The timezone string of the input, if it should be timezone aware
 
     Returns:
     A datetime object set for today as the day and the
@@ -135,18 +152,64 @@ def __convert_hour_input(input: str) -> datetime:
 
     hour_only = int(input.split(':')[0])
     minute_only = int(input.split(':')[1])
-    return datetime.now().replace(hour=hour_only, minute=minute_only, second=0, microsecond=0)
+    now = datetime.now(get_local_zone(time_zone)) if time_zone else datetime.now()
+    return now.replace(hour=hour_only, minute=minute_only, second=0, microsecond=0)
+
+
+def parse_hour(value: str, time_zone: str, day: date = None) -> datetime:
+    """
+    Converts an hour (hh:mm) of a configuration to a timezone aware datetime
+
+    Parameters:
+    value: str - The hour in "hh:mm" format
+    time_zone: str - The timezone string of the hour
+    day: date - The day of the hour, default is today
+
+    Returns:
+    A datetime object set for the day, at the hour given
+
+    Raises:
+    ValueError - If the value is not in "hh:mm" format
+    """
+
+    if not isinstance(value, str) or not is_input_an_hour(value):
+        raise ValueError(f"'{value}' is not in hh:mm format")
+
+    local_tz = get_local_zone(time_zone)
+    hour_only, minute_only = value.split(':')
+    return datetime.combine(day or datetime.now(local_tz).date(),
+        time(int(hour_only), int(minute_only)), tzinfo=local_tz)
+
+
+def parse_duration(value: str) -> timedelta:
+    """
+    Converts a duration (hh:mm) of a configuration to a timedelta
+
+    Parameters:
+    value: str - The duration in "hh:mm" format, the hours can be more than 23
+
+    Returns:
+    The duration
+
+    Raises:
+    ValueError - If the value is not in "hh:mm" format
+    """
+
+    if not isinstance(value, str) or not DURATION_PATTERN.match(value):
+        raise ValueError(f"'{value}' is not a duration in hh:mm format")
+
+    hours, minutes = value.split(':')
+    return timedelta(hours=int(hours), minutes=int(minutes))
 
 
 def __check_input_in_windows(input: datetime,
-        windows: List[Tuple[datetime, datetime]], after_than: datetime = None) -> bool:
+        windows: IntervalSet, after_than: datetime = None) -> bool:
     """
     Checks if input is in one of the windows specified
 
     Parameters:
     input: datetime - The input time to be checked
-    windows: List[Tuple[datetime, datetime]] - The time windows the input
-        needs to be checked against
+    windows: IntervalSet - The time windows the input needs to be checked against
     after_than: datetime - If this parameter is set, it means we have a start time already,
         and need to check the input to be after this time as well
 
@@ -163,27 +226,23 @@ def __check_input_in_windows(input: datetime,
     if after_than:
 
         # If there are windows, only the one where after_than is, matters
-        for window in windows:
-            if after_than >= window[0] and after_than <= window[1]:
-                return input >= after_than and input <= window[1]
+        window = windows.find(after_than)
+        return window is not None and input >= after_than and input <= window[1]
 
     else:
-        for window in windows:
-            if input >= window[0] and input <= window[1]:
-                return True
+        return windows.contains(input)
 
-        return False
 
-
-def __get_windows_error_message(windows: List[Tuple[datetime, datetime]],
-        after_than: datetime = None) -> str:
+def __get_windows_error_message(windows: IntervalSet,
+        after_than: datetime = None, time_zone: str = None) -> str:
     """
     Constructs the error message if the input has failed the conditions
 
     Parameters:
-    windows: List[Tuple[datetime, datetime]] - The time windows the input was checked against
+    windows: IntervalSet - The time windows the input was checked against
     after_than: datetime - If this parameter is set, it means we have a start time already,
         and have to construct this into the error message as well
+    time_zone: str - The timezone string the times are displayed in
 
     Returns:
     The error message to be thrown back to the user
@@ -194,20 +253,21 @@ def __get_windows_error_message(windows: List[Tuple[datetime, datetime]],
 
         # If windows is empty, only the after_than confition could have been failed
         if len(windows) == 0:
-            return f"Time must be after {after_than.strftime('%H:%M')}"
+            return f"Time must be after {format_hour(after_than, time_zone)}"
 
         # If there are windows, only the one where after_than is, matters
-        for window in windows:
-            if after_than >= window[0] and after_than <= window[1]:
-                return f"Time must be after {after_than.strftime('%H:%M')} " + \
-                    f"and before {window[1].strftime('%H:%M')}"
+        window = windows.find(after_than)
+        if window:
+            return f"Time must be after {format_hour(after_than, time_zone)} " + \
+                f"and before {format_hour(window[1], time_zone)}"
 
     else:
         error_message = "Time must be between one of these windows: "
 
         index = 0
         for window in windows:
-            error_message += f"{window[0].strftime('%H:%M')} - {window[1].strftime('%H:%M')}"
+            error_message += \
+                f"{format_hour(window[0], time_zone)} - {format_hour(window[1], time_zone)}"
 
             if index < len(windows) - 1:
                 error_message += ", "
@@ -235,144 +295,273 @@ def add_new_window(new_window: Tuple[datetime, datetime],
         windows.append(new_window)
         return windows
 
-    index = 0
-    for window in windows:
-        if new_window[0] >= window[0] and new_window[0] <= window[1]:
+    return IntervalSet(windows).subtract(new_window).to_list()
 
-            # Append new entry to the next position
-            windows.insert(index+1, (new_window[1], window[1]))
 
-            # Alter current windows' end
-            windows[index] = (window[0], new_window[0])
+def get_workspace_key(token: str, user_id: str) -> str:
+    """
+    Creates the key of a workspace's user in the status file.
+    The token is hashed, so it is not stored in plain text.
 
-            break
-        index += 1
+    Parameters:
+    token: str - The Slack API token of the workspace
+    user_id: str - The id of the user in the workspace
 
-    # Delete windows where the starting and ending time is the same
-    windows = [tup for tup in windows if tup[0] != tup[1]]
+    Returns:
+    The key as a hex string
+    """
 
-    return windows
+    return hashlib.sha256(f'{token}:{user_id}'.encode()).hexdigest()
 
 
-def get_old_status() -> None | str:
+def get_file_name(name: str) -> str:
     """
-    Get old status if it exists in the status file
+    Converts a user name into a part of a file name (f.e. of the token and snapshot files).
+    The unsafe characters are replaced, and a hash of the original name is appended then,
+    so different names can't end up in the same files.
 
     Parameters:
-    None
+    name: str - The name of the user
 
     Returns:
-    None, if the status file does not exist or it's not for today.
-    The status message otherwise.
+    The name itself if it is safe, the sanitized name otherwise
     """
 
-    old_status = file.read_status_file()
-    current_month = datetime.now().month
-    current_day = datetime.now().day
-    if old_status is not False and old_status[0] == current_month and old_status[1] == current_day:
-        return old_status[2]
-    else:
-        return None
+    file_name = UNSAFE_FILE_NAME_PATTERN.sub('_', name)
+    if file_name == name:
+        return name
 
+    return f'{file_name}_{hashlib.sha256(name.encode()).hexdigest()[:8]}'
 
-def parse_google_meetings(google_meetings: List[Dict]) \
-        -> List[Tuple[datetime, datetime]]:
+
+def get_status_digest(status_message: str, status_emoji: str, status_expiry_date: int) -> str:
+    """
+    Creates a digest of a status, used to check if the status has changed since the last run
+
+    Parameters:
+    status_message: str - The text of the status
+    status_emoji: str - The emoji of the status
+    status_expiry_date: int - The POSIX timestamp of the status' expiration
+
+    Returns:
+    The digest as a hex string
+    """
+
+    return hashlib.sha256(
+        f'{status_message}\n{status_emoji}\n{status_expiry_date}'.encode()).hexdigest()
+
+
+def parse_iso_datetimes(values: List[str]) -> List[datetime]:
+    """
+    Converts a list of ISO 8601 date or datetime strings in a single pass.
+    The fractional seconds are normalized to microseconds and the 'Z' suffix to '+00:00'
+    first, so any precision (f.e. teams sends 7 digits) is accepted by fromisoformat.
+
+    Parameters:
+    values: List[str] - The strings, f.e. '2024-01-01', '2024-01-01T10:00:00+01:00'
+        or '2024-01-01T09:00:00.0000000'
+
+    Returns:
+    The datetime objects in the same order. The ones with an offset are timezone aware.
+    """
+
+    return [
+        datetime.fromisoformat(
+            FRACTION_PATTERN.sub(__pad_fraction, value).replace('Z', '+00:00'))
+        for value in values
+    ]
+
+
+def __pad_fraction(match: re.Match) -> str:
+    """
+    Cuts or pads the fractional seconds matched to exactly 6 digits
+
+    Parameters:
+    match: re.Match - The match of FRACTION_PATTERN
+
+    Returns:
+    The fraction with 6 digits, f.e. '.000000'
+    """
+
+    return '.' + (match.group(1) + '000000')[:6]
+
+
+def parse_google_meetings(google_meetings: List[Dict], time_zone: str,
+        window: Tuple[datetime, datetime] = None) -> List[Tuple[datetime, datetime]]:
     """
         Utility function to parse meetings coming from google calendar API
 
         Parameters:
         google_meetings: List[Dict] - The raw meetings input from google
+        time_zone: str - The timezone string (f.e. 'Europe/Amsterdam') of the current day.
+            All day events (sent as dates without time) are taken in this timezone.
+        window: Tuple[datetime, datetime] - The meetings starting in this window are kept,
+            default is the current day
 
         Returns:
-        All meetings for the current day with their start and end time.
+        All meetings for the window with their start and end time, see normalize_meetings.
+        Cancelled meetings and the ones not blocking time (transparent) are skipped.
     """
 
-    # Initialize return list
-    return_list = []
-
     # Return on empty list or None object
     if not google_meetings:
-        return return_list
+        return []
+
+    # Skip the events that don't make the user busy, google sends the times with an offset
+    return normalize_meetings([
+        (
+            meeting["start"].get("dateTime", meeting["start"].get("date")),
+            meeting["end"].get("dateTime", meeting["end"].get("date")),
+            None
+        )
+        for meeting in google_meetings
+        if meeting.get("status") != "cancelled" and meeting.get("transparency") != "transparent"
+    ], time_zone, window)
+
+
+def parse_teams_meetings(teams_meetings: List[Dict], time_zone: str,
+        window: Tuple[datetime, datetime] = None) -> List[Tuple[datetime, datetime]]:
+    """
+        Utility function to parse meetings coming from azure teams API
 
-    # Get start and end date for each meeting
-    for meeting in google_meetings:
+        Parameters:
+        teams_meetings: List[Dict] - The raw meetings input from teams
+        time_zone: str - The timezone string (f.e. 'Europe/Amsterdam') of the current day.
+        window: Tuple[datetime, datetime] - The meetings starting in this window are kept,
+            default is the current day
 
-        # Get start end end dates
-        start = meeting["start"].get("dateTime", meeting["start"].get("date"))
-        end = meeting["end"].get("dateTime", meeting["end"].get("date"))
+        Returns:
+        All meetings for the window with their start and end time, see normalize_meetings.
+        Cancelled meetings and the ones showing the user as free are skipped.
+    """
 
-        # If the times are saved with timezone, we cut it
-        start = start.split('+')[0]
-        end = end.split('+')[0]
+    # Return on empty list or None object
+    if not teams_meetings:
+        return []
+
+    # Skip the events that don't make the user busy, teams sends the times without an offset,
+    # in UTC (unless another timezone is set for the dates in the meeting)
+    return normalize_meetings([
+        (
+            meeting["start"].get("dateTime", meeting["start"].get("date")),
+            meeting["end"].get("dateTime", meeting["end"].get("date")),
+            meeting["start"].get("timeZone", "UTC")
+        )
+        for meeting in teams_meetings
+        if not meeting.get("isCancelled", False) and meeting.get("showAs") != "free"
+    ], time_zone, window)
+
+
+def normalize_meetings(raw_meetings: List[Tuple[str, str, str | None]], time_zone: str,
+        window: Tuple[datetime, datetime] = None) -> List[Tuple[datetime, datetime]]:
+    """
+        The normalization stage every integration's meetings go through. Converts the start and
+        end times of the meetings in one pass into timezone aware UTC datetimes, and keeps the
+        meetings starting in the window (by default on the current day, in the local timezone).
 
-        # Convert to datetime
-        try:
-            start = datetime.strptime(start, '%Y-%m-%dT%H:%M:%S')
-        except ValueError:
-            start = datetime.strptime(start, '%Y-%m-%d')
+        Parameters:
+        raw_meetings: List[Tuple[str, str, str | None]] - The meetings as (start, end, timezone)
+            tuples. The start and end are ISO 8601 strings. The ones with an offset are taken
+            as is, the ones without are taken in the timezone of the tuple, or in the local
+            timezone if it's None.
+        time_zone: str - The local timezone string (f.e. 'Europe/Amsterdam')
+        window: Tuple[datetime, datetime] - The timezone aware start (inclusive) and end
+            (exclusive) of the window, default is the current day
 
-        try:
-            end = datetime.strptime(end, '%Y-%m-%dT%H:%M:%S')
-        except ValueError:
-            end = datetime.strptime(end, '%Y-%m-%d')
+        Returns:
+        The meetings of the window with their start and end time, in UTC
+    """
 
-        # If meeting is not for today, skip it
-        now = datetime.now()
-        if now.month != start.month or now.day != start.day:
-            continue
+    local_tz = get_local_zone(time_zone)
+    day_start, day_end = window or get_day_bounds(time_zone)
+
+    starts = parse_iso_datetimes([raw_meeting[0] for raw_meeting in raw_meetings])
+    ends = parse_iso_datetimes([raw_meeting[1] for raw_meeting in raw_meetings])
+
+    return_list = []
+    for raw_meeting, start, end in zip(raw_meetings, starts, ends):
+
+        # Attach the timezone to the times sent without an offset
+        if start.tzinfo is None or end.tzinfo is None:
+            source_tz = __get_zone(raw_meeting[2]) if raw_meeting[2] else local_tz
+            start = start if start.tzinfo else start.replace(tzinfo=source_tz)
+            end = end if end.tzinfo else end.replace(tzinfo=source_tz)
 
-        return_list.append((start, end))
+        # Keep the meetings of the window only
+        if day_start <= start < day_end:
+            return_list.append((start.astimezone(timezone.utc), end.astimezone(timezone.utc)))
 
     return return_list
 
 
-def parse_teams_meetings(teams_meetings: List[Dict], time_zone: str) -> \
-        List[Tuple[datetime, datetime]]:
+@lru_cache(maxsize=None)
+def get_local_zone(time_zone: str) -> ZoneInfo:
     """
-        Utility function to parse meetings coming from azure teams API
+        Gets the local timezone by its name. Cached, so it's only looked up once.
 
         Parameters:
-        teams_meetings: List[Dict] - The raw meetings input from teams
-        time_zone: str - The timezone string (f.e. 'Europe/Amsterdam'). The dates are converted
-            using the timezone since teams sends the dates in UTC.
+        time_zone: str - The timezone string (f.e. 'Europe/Amsterdam')
 
         Returns:
-        All meetings for the current day with their start and end time.
+        The timezone
     """
 
-    # Initialize return list
-    return_list = []
+    return ZoneInfo(time_zone)
 
-    # Return on empty list or None object
-    if not teams_meetings:
-        return return_list
 
-    # Get start and end date for each meeting
-    for meeting in teams_meetings:
+def get_day_bounds(time_zone: str, day: date = None) -> Tuple[datetime, datetime]:
+    """
+        Calculates the boundaries of a day in the local timezone
+
+        Parameters:
+        time_zone: str - The timezone string (f.e. 'Europe/Amsterdam')
+        day: date - The day, default is the current day
 
-        # Get start end end dates
-        start = meeting["start"].get("dateTime", meeting["start"].get("date"))
-        end = meeting["end"].get("dateTime", meeting["end"].get("date"))
+        Returns:
+        The start of the day and the start of the next day, as timezone aware datetimes
+    """
 
-        # Cut the millisecond from the times
-        start = start.split('.')[0]
-        end = end.split('.')[0]
+    local_tz = get_local_zone(time_zone)
+    day = day or datetime.now(local_tz).date()
 
-        # Convert to datetime
-        utc = ZoneInfo('UTC')
-        start = datetime.strptime(start, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=utc)
-        end = datetime.strptime(end, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=utc)
+    # Add the day on the date, so the days with a DST change are handled
+    return datetime.combine(day, time(), tzinfo=local_tz), \
+        datetime.combine(day + timedelta(days=1), time(), tzinfo=local_tz)
 
-        # Apply timezone from param
-        param_tz = ZoneInfo(time_zone)
-        start = start.astimezone(param_tz).replace(tzinfo=None)
-        end = end.astimezone(param_tz).replace(tzinfo=None)
 
-        # If meeting is not for today, skip it
-        now = datetime.now()
-        if now.year != start.year or now.month != start.month or now.day != start.day:
-            continue
+def format_hour(value: datetime, time_zone: str = None) -> str:
+    """
+        Formats the time of a datetime as hh:mm, in the local timezone
 
-        return_list.append((start, end))
+        Parameters:
+        value: datetime - The datetime to format
+        time_zone: str - The local timezone string. If set, timezone aware datetimes
+            are converted to it first.
 
-    return return_list
+        Returns:
+        The formatted time, f.e. 08:00
+    """
+
+    if time_zone and value.tzinfo:
+        value = value.astimezone(get_local_zone(time_zone))
+
+    return value.strftime('%H:%M')
+
+
+@lru_cache(maxsize=None)
+def __get_zone(time_zone: str) -> ZoneInfo:
+    """
+        Gets the timezone by its name, falls back to UTC for unknown names
+        (f.e. Windows timezone names, which can be sent by teams)
+
+        Parameters:
+        time_zone: str - The timezone string (f.e. 'Europe/Amsterdam')
+
+        Returns:
+        The timezone
+    """
+
+    try:
+        return ZoneInfo(time_zone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')